@@ -29,7 +29,7 @@ except ModuleNotFoundError:
 
 from abr_dataset_tools.utils import expandpath, parse_dataset_configs, \
     build_dataset_info, build_directory_info, build_render_setup, build_camera_info, \
-    plot_sample, corners3d_outside_image
+    plot_sample, corners3d_outside_image, read_single_channel
 
 from abr_dataset_tools import get_logger
 logger = get_logger()
@@ -221,10 +221,8 @@ class ABRDataset:
                 log_msg += f'ATTENTION: Projected 3d bbox of {obj_name_id} partially outside of the image view\n'
 
             fname_mask_png = f"{self.fnames[index]}{obj['mask_name']}.png"
-            mask = imageio.imread(os.path.join(self.dir_info['images']['mask'], fname_mask_png))
-    
-            # collapse mask and depth to single axis (blender returns mask and depth with 3 channels)
-            mask = (mask[:, :, 0] / np.max(mask)).astype(np.uint8)
+            mask = read_single_channel(os.path.join(self.dir_info['images']['mask'], fname_mask_png))
+            mask = (mask / np.max(mask)).astype(np.uint8)
             
             obj['mask'] = mask
 
@@ -256,7 +254,7 @@ class ABRDataset:
 
         # work out images
         rgb = imageio.imread(os.path.join(self.dir_info['images']['rgb'], fname_png))
-        backdrop = imageio.imread(os.path.join(self.dir_info['images']['backdrop'], fname_png))[:, :, 0]
+        backdrop = read_single_channel(os.path.join(self.dir_info['images']['backdrop'], fname_png))
         range_img = imageio.imread(os.path.join(self.dir_info['images']['range'], fname_png.replace("png", "exr")))
         depth = imageio.imread(os.path.join(self.dir_info['images']['depth'], fname_png))
         # collapse depth to single axis
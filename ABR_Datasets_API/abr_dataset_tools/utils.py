@@ -19,6 +19,7 @@
 import os
 from configparser import ConfigParser
 import numpy as np
+import imageio
 import matplotlib.pyplot as plt
 import matplotlib.patches as ptc
 from abr_dataset_tools import get_logger
@@ -202,6 +203,24 @@ def build_camera_info(cfg):
     return cam_info
 
 
+def read_single_channel(path: str):
+    """Read an image and collapse it to a single channel.
+
+    Blender stores masks and backdrops with 3 channels, unless they were
+    rendered as single channel (BW) images.
+
+    Args:
+        path(str): path to image file
+
+    Returns:
+        np.array of shape (height, width)
+    """
+    img = imageio.imread(path)
+    if img.ndim == 3:
+        img = img[:, :, 0]
+    return img
+
+
 def quaternion_to_rotation_matrix(q, quat_conv='WXYZ'):
     """
     Computes rotation matrix out of the quaternion (WXYZ (default) or XYZW convention).
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 - for information on the respective copyright owner
+# see the NOTICE file and/or the repository
+# <https://github.com/boschresearch/amira-blender-rendering>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import imageio
+from abr_dataset_tools.utils import read_single_channel
+
+"""Test file for image loading helpers in abr_dataset_tools.utils"""
+
+
+class TestReadSingleChannel(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self._img = np.zeros((4, 6), dtype=np.uint8)
+        self._img[1:3, 2:5] = 255
+
+    def _write(self, name, img):
+        fpath = os.path.join(self._tmpdir, name)
+        imageio.imwrite(fpath, img)
+        return fpath
+
+    def test_bw_mask_and_backdrop(self):
+        # masks and backdrop stored with render_setup.bw_masks
+        for name in ('mask.png', 'backdrop.png'):
+            img = read_single_channel(self._write(name, self._img))
+            self.assertEqual(img.shape, self._img.shape)
+            np.testing.assert_array_equal(img, self._img)
+
+    def test_rgb_mask_and_backdrop(self):
+        # masks and backdrop stored with 3 channels (default)
+        rgb = np.stack([self._img] * 3, axis=-1)
+        for name in ('mask.png', 'backdrop.png'):
+            img = read_single_channel(self._write(name, rgb))
+            self.assertEqual(img.shape, self._img.shape)
+            np.testing.assert_array_equal(img, self._img)
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+
+def main():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestReadSingleChannel))
+    runner = unittest.TextTestRunner()
+    runner.run(suite)
+
+
+if __name__ == '__main__':
+    main()
@@ -31,6 +31,10 @@ import sys
 import os
 import re
 import argparse
+from functools import lru_cache
+
+# pattern to extract the scene_type from a configuration file
+_SCENE_TYPE_RE = re.compile(r'^\s*scene_type\s*=\s*(.*?)\s*$', re.IGNORECASE)
 
 
 def _err_msg():
@@ -109,6 +113,18 @@ def get_cmd_argparser():
         help='Select render mode. Currently supported: default (ie single view), multiview (ie moving cameras) dataset',
         dest='render_mode')
 
+    parser.add_argument(
+        '--start',
+        type=int,
+        default=0,
+        help='Index of the first (static) scene to render. Used to split the dataset among multiple workers')
+
+    parser.add_argument(
+        '--stop',
+        type=int,
+        default=None,
+        help='Index (exclusive) of the last (static) scene to render. Default: render up to dataset.scene_count')
+
     parser.add_argument(
         '--list-scenes',
         action='store_true',
@@ -136,24 +152,27 @@ def get_cmd_argparser():
     return parser
 
 
+@lru_cache(maxsize=1)
 def get_scene_types():
+    """Get all registered scenes, with lower-case scene names as keys.
+
+    Returns:
+        tuple(dict, dict): registered scenes, and the same scenes with lower-case keys
+    """
     from amira_blender_rendering.scenes import get_registered
-    return get_registered()
+    scene_types = get_registered()
+    return scene_types, dict((k.lower(), v) for k, v in scene_types.items())
 
 
 def determine_scene_type(config_file):
     """Determine the scene type given a configuration file."""
-    # don't parse the entire ini file, only look for scene_type
-    scene_type = None
-    pattern = re.compile('^\s*scene_type\s*=\s*(.*)\s*$', re.IGNORECASE)
+    # don't parse the entire ini file, only look for (the first) scene_type
     with open(config_file) as f:
         for line in f:
-            match = pattern.match(line)
+            match = _SCENE_TYPE_RE.match(line)
             if match is not None:
-                scene_type = match.group(1)
-    if scene_type is None:
-        raise RuntimeError("scene_type missing from configuration file. Is your config valid?")
-    return scene_type
+                return match.group(1)
+    raise RuntimeError("scene_type missing from configuration file. Is your config valid?")
 
 
 def main():
@@ -176,16 +195,14 @@ def main():
     logger = configure_logger(cmd_args.logging_level)
 
     # pretty print available scenarios?
-    scene_types = get_scene_types()
+    # NOTE: keys of scene_types are lower-case
+    registered_scene_types, scene_types = get_scene_types()
     if cmd_args.list_scenes:
         print("List of possible scenes:")
-        for k, _ in scene_types.items():
+        for k, _ in registered_scene_types.items():
             print(f"   {k}")
         sys.exit(0)
 
-    # change all keys to lower-case
-    scene_types = dict((k.lower(), v) for k, v in scene_types.items())
-
     # check scene_type in config
     scene_type_str = determine_scene_type(cmd_args.config)
     if scene_type_str.lower() not in scene_types:
@@ -219,20 +236,25 @@ def main():
     #       to run the script twice, with two different configurations, to
     #       generate the split. This is significantly easier than internally
     #       maintaining split configurations.
-    scene = scene_types[scene_type_str.lower()]['scene'](config=config, render_mode=cmd_args.render_mode)
+    # NOTE: start and stop allow to render only a block of (static) scenes. This is
+    #       used by abrgen to distribute the dataset among multiple blender workers.
+    #       Filenames use global scene indices, hence workers never overwrite each other
+    scene = scene_types[scene_type_str.lower()]['scene'](config=config, render_mode=cmd_args.render_mode,
+                                                         start=cmd_args.start, stop=cmd_args.stop)
     # save the config early. In case something goes wrong during rendering, we
     # at least have the config + potentially some images
     scene.dump_config()
 
-    # generate the dataset
+    # generate the dataset. The scene is torn down even if generation fails.
+    # This should be handled by blender, but a scene might have other things
+    # opened that it should close gracefully, e.g. pending annotation writes
     success = False
-    success = scene.generate_dataset()
-    if not success:
-        logger.error("Error while generating dataset")
-
-    # tear down scene. should be handled by blender, but a scene might have
-    # other things opened that it should close gracefully
-    scene.teardown()
+    try:
+        success = scene.generate_dataset()
+        if not success:
+            logger.error("Error while generating dataset")
+    finally:
+        scene.teardown()
 
 
 if __name__ == "__main__":
@@ -22,29 +22,119 @@ things to certain scenarios which has an impact on the generated dataset.
 """
 
 import os
+import numpy as np
+from functools import lru_cache
 # from math import ceil
 from amira_blender_rendering.utils.io import expandpath
 from amira_blender_rendering.datastructures import DynamicStruct
 
 
+# file extensions of images that can be used as environment textures
+IMAGE_EXTENSIONS = frozenset(['.hdr', '.exr', '.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp'])
+
+
+@lru_cache(maxsize=None)
 def get_environment_textures(base_path):
     """Determine if the user wants to set specific environment texture, or
     randomly select from a directory
 
+    The result is cached per base_path, and all returned paths are already
+    expanded, such that they can be used directly during rendering. When
+    base_path is a directory, only files with an image extension (see
+    IMAGE_EXTENSIONS) are returned.
+
     Args:
-        cfg(Configuration): config with render setup
+        base_path(str): path to a single texture, or to a directory of textures
+
+    Returns:
+        tuple(str): expanded path(s) to environment texture(s)
     """
     # this rise a KeyError if 'environment_texture' not in cfg
     environment_textures = expandpath(base_path)
     if os.path.isdir(environment_textures):
-        files = os.listdir(environment_textures)
-        environment_textures = [os.path.join(environment_textures, f) for f in files]
+        with os.scandir(environment_textures) as it:
+            environment_textures = tuple(
+                e.path for e in it if e.is_file() and os.path.splitext(e.name)[1].lower() in IMAGE_EXTENSIONS)
     else:
-        environment_textures = [environment_textures]
+        environment_textures = (environment_textures, )
 
     return environment_textures
 
 
+def annotation_exists(dirinfo, base_filename: str):
+    """Check if the annotation for base_filename was already written.
+
+    Annotations (OpenCV convention last) are the final output of
+    postprocessing. Hence, if they exist, the image was completely rendered.
+
+    Args:
+        dirinfo(DynamicStruct): directory information, see build_directory_info
+        base_filename(str): base filename of the image, e.g. s000_v0
+
+    Returns:
+        bool: True if the annotation exists
+    """
+    return os.path.exists(os.path.join(dirinfo.annotations.opencv, f'{base_filename}.json'))
+
+
+def format_width(count: int):
+    """Number of digits required to zero-pad indices 0, ..., count - 1.
+
+    Args:
+        count(int): number of indices
+
+    Returns:
+        int: format width, at least 1
+    """
+    return max(1, len(str(max(0, count - 1))))
+
+
+class RandomChoice():
+    """Draw random elements from a sequence.
+
+    Indices are drawn in blocks with a single call to numpy's random number
+    generator, instead of one call to random.choice per draw.
+
+    Example:
+
+        >>> choice = RandomChoice(get_environment_textures('$AMIRA_DATASETS/OpenImagesV4/Images'))
+        >>> filepath = choice()
+    """
+
+    def __init__(self, items, block_size: int = 1024, rng: np.random.Generator = None):
+        """Args:
+            items(sequence): elements to choose from
+            block_size(int): number of indices that are drawn at once
+            rng(np.random.Generator): random number generator. If None, a new unseeded one is used
+        """
+        if len(items) == 0:
+            raise ValueError('Cannot choose from an empty sequence')
+        self.items = items
+        self.block_size = block_size
+        self.rng = np.random.default_rng() if rng is None else rng
+        self._indices = np.empty(0, dtype=np.int64)
+        self._pos = 0
+
+    def __call__(self):
+        if self._pos >= len(self._indices):
+            self._indices = self.rng.integers(0, len(self.items), size=self.block_size)
+            self._pos = 0
+        item = self.items[self._indices[self._pos]]
+        self._pos += 1
+        return item
+
+    def reset(self, rng: np.random.Generator = None):
+        """Discard the indices that were drawn in advance.
+
+        Args:
+            rng(np.random.Generator): if given, draw from this generator from now on
+        """
+        if rng is not None:
+            self.rng = rng
+        self._indices = np.empty(0, dtype=np.int64)
+        self._pos = 0
+
+
 #
 #
 # NOTE: the functions and classes below were partially taken from amira_perception. Make
@@ -88,6 +178,20 @@ def build_directory_info(base_path: str, **kwargs):
     return dir_info
 
 
+def create_directory_tree(dirinfo):
+    """Create all image and annotation directories of a dataset.
+
+    This should be called once during setup, such that no directories need to
+    be checked or created while rendering.
+
+    Args:
+        dirinfo(DynamicStruct): directory information, see build_directory_info
+    """
+    for group in (dirinfo.images, dirinfo.annotations):
+        for k in group:
+            os.makedirs(group[k], exist_ok=True)
+
+
 def dump_config(cfg, output_path):
     """Dumps the configuration to the output directory"""
 
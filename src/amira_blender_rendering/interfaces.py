@@ -24,7 +24,7 @@ In particular, it specifies how rendering results should be stored.
 import os
 import pathlib
 import bpy
-from math import ceil, log
+from amira_blender_rendering.dataset import format_width
 from amira_blender_rendering.datastructures import filter_state_keys
 from amira_blender_rendering.math.geometry import rotation_matrix_to_quaternion
 from amira_blender_rendering.utils.logging import get_logger
@@ -88,7 +88,7 @@ def _save_camera_locations_to_blend(name: str, locations: list, filepath: str):
     bpy.ops.wm.save_as_mainfile(filepath=filepath)
 
     # clear objects and collection
-    bpy.ops.object.select_all(action='DESELECT')
+    blnd.deselect_all()
     for tmp_cam in tmp_cameras:
         bpy.data.objects.remove(tmp_cam)
     bpy.data.collections.remove(tmp_cam_coll)
@@ -171,8 +171,8 @@ class ABRScene():
             pathlib.Path(logpath).mkdir(parents=True, exist_ok=True)
             
             # file specs
-            scn_frmt_w = int(ceil(log(self.config.dataset.scene_count, 10)))
-            view_frmt_w = int(ceil(log(self.config.dataset.view_count, 10)))
+            scn_frmt_w = format_width(self.config.dataset.scene_count)
+            view_frmt_w = format_width(self.config.dataset.view_count)
             scn_str = f'_s{scn_idx:0{scn_frmt_w}}'
             view_str = f'_v{view_idx:0{view_frmt_w}}'
 
@@ -94,6 +94,51 @@ def p2d_to_pixel_coords(p: Vector, render: bpy.types.RenderSettings = bpy.contex
                    (render.resolution_y - 1) * (p.y - 1.0) / -2.0))
 
 
+def get_world_to_clip_matrix(camera: bpy.types.Object = bpy.context.scene.camera,
+                             render: bpy.types.RenderSettings = bpy.context.scene.render) -> np.ndarray:
+    """Get the 4x4 transform from world coordinates to homogeneous clip space
+    coordinates of a camera, i.e. the combined projection and model-view matrix
+    used in project_p3d.
+
+    Args:
+        camera (bpy.types.Object): blender camera to use for projection
+        render (bpy.types.RenderSettings): render settings used for computation
+
+    Returns:
+        np.array(4, 4) world to clip space transform
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    projection = camera.calc_matrix_camera(
+        depsgraph,
+        x=render.resolution_x,
+        y=render.resolution_y,
+        scale_x=render.pixel_aspect_x,
+        scale_y=render.pixel_aspect_y)
+    return np.asarray(projection) @ np.asarray(camera.matrix_world.inverted())
+
+
+def project_to_pixel_coords(points, world_to_clip: np.ndarray,
+                            render: bpy.types.RenderSettings = bpy.context.scene.render) -> np.ndarray:
+    """Project 3D points in world coordinates to pixel coordinates.
+
+    This is the batched equivalent of project_p3d followed by p2d_to_pixel_coords.
+
+    Args:
+        points: (N, 3) array of 3D points in world coordinates
+        world_to_clip (np.array(4, 4)): camera transform, see get_world_to_clip_matrix
+        render (bpy.types.RenderSettings): render settings used for computation
+
+    Returns:
+        (N, 2) array with screen space (pixel) coordinates of the points. Points
+        at infinity are not handled, i.e. result in non-finite values
+    """
+    points = np.asarray(points)
+    p_hom = points @ world_to_clip[:, :3].T + world_to_clip[:, 3]
+    ndc = p_hom[:, :2] / p_hom[:, 3:]
+    return np.column_stack(((render.resolution_x - 1) * (ndc[:, 0] + 1.0) / +2.0,
+                            (render.resolution_y - 1) * (ndc[:, 1] - 1.0) / -2.0))
+
+
 def get_relative_rotation(obj1: bpy.types.Object, obj2: bpy.types.Object = bpy.context.scene.camera) -> Euler:
     """Get the relative rotation between two objects in terms of the second
     object's coordinate system. Note that the second object will be default
@@ -229,6 +274,48 @@ def test_visibility(obj, cam, width, height, require_all=True):
         return all(oks) if require_all else any(oks)
 
 
+def test_outside_frustum(objs, cam, render: bpy.types.RenderSettings = bpy.context.scene.render):
+    """Test which objects lie completely outside the view frustum of a camera.
+
+    This is a cheap, conservative test on the (world space) bounding boxes of
+    the objects: an object is reported outside only if all corners of its
+    bounding box lie on the outer side of the same frustum plane. Objects for
+    which this function returns False might still not be visible, use
+    test_occlusion to get a definite answer.
+
+    Note that the camera and objects world matrices must be up to date, i.e.
+    the depsgraph must have been updated after changing their locations.
+
+    Args:
+        objs: list of objects to evaluate
+        cam: camera to evaluate
+        render (bpy.types.RenderSettings): render settings used for computation
+
+    Returns:
+        np.array of bool, True for each object that is outside the frustum
+    """
+    if len(objs) == 0:
+        return np.zeros(0, dtype=bool)
+
+    world_to_clip = get_world_to_clip_matrix(cam, render)
+
+    # homogeneous bounding box corners of all objects in clip space, (N, 8, 4)
+    corners = np.ones((len(objs), 8, 4))
+    corners[:, :, :3] = [obj.bound_box for obj in objs]
+    obj_to_clip = world_to_clip @ np.asarray([obj.matrix_world for obj in objs])
+    corners = np.einsum('nij,nkj->nki', obj_to_clip, corners)
+    x, y, w = corners[..., 0], corners[..., 1], corners[..., 3]
+
+    # the pixel space test in test_occlusion accepts slightly more than [-1, 1]
+    # (see p2d_to_pixel_coords). Widen the frustum accordingly
+    bx = (render.resolution_x + 1) / max(1, render.resolution_x - 1)
+    by = (render.resolution_y + 1) / max(1, render.resolution_y - 1)
+
+    return np.all(w <= 0, axis=1) \
+        | np.all(x > bx * w, axis=1) | np.all(x < -bx * w, axis=1) \
+        | np.all(y > by * w, axis=1) | np.all(y < -by * w, axis=1)
+
+
 def test_occlusion(scene, layer, cam, obj, width, height, require_all=True, origin_offset=0.01):
     """Test if an object is visible or occluded by another object by checking its vertices.
     Note that this also tests if an object is visible.
@@ -38,6 +38,7 @@ class CompositorNodesOutputRenderedObjects():
         # list of objects to handle and corresponding unique name.
         # These are used to setup socket and outputfiles
         self.objs = []
+        self.mask_sockets = []
         self.scene = None
 
     def __extract_pathspec(self):
@@ -67,15 +68,20 @@ class CompositorNodesOutputRenderedObjects():
         self.path_backdrop = self.dirinfo.images.backdrop[len(prefix) + 1:]
         self.path_backdrop = os.path.join(self.path_backdrop, '')
 
+    def __setup_mask_format(self, socket, bw_masks: bool):
+        """Store masks in the node format, or as single channel 8bit png"""
+        socket.use_node_format = not bw_masks
+        if bw_masks:
+            socket.format.file_format = 'PNG'
+            socket.format.color_mode = 'BW'
+            socket.format.color_depth = '8'
+            # light compression, masks are read again during postprocessing
+            socket.format.compression = 15
+
     def __update_node_paths(self):
         """This function will update all base-path knowledge in the node editor"""
 
-        # get node tree
-        tree = bpy.context.scene.node_tree
-        nodes = tree.nodes
-
-        n_output_file = nodes['RenderObjectsFileOutputNode']
-        n_output_file.base_path = self.path_base
+        self.nodes['n_output_file'].base_path = self.path_base
 
     # NOTE: setup was split into setup_nodes and setup_pathspec
     def setup_nodes(self, objs: list, scene: bpy.types.Scene = bpy.context.scene, **kw):
@@ -94,6 +100,11 @@ class CompositorNodesOutputRenderedObjects():
                 ]
             scene (bpy.types.Scene): blender scene on which to operate
 
+        Kwargs:
+            color_depth (int): color depth of png outputs. Default: 16
+            bw_masks (bool): store masks as single channel 8bit png. Default: False
+            index_viewer (bool): attach a viewer node to the object index pass. Default: False
+
         Returns:
             dict containing all file output sockets. This dict can be passed to
             update_compositor_nodes_rendered_objects in case of dynamic filename changes.
@@ -114,6 +125,7 @@ class CompositorNodesOutputRenderedObjects():
         # add file output node and setup format (16bit RGB without alpha channel)
         n_output_file = nodes.new('CompositorNodeOutputFile')
         n_output_file.name = 'RenderObjectsFileOutputNode'
+        self.nodes['n_output_file'] = n_output_file
         # n_output_file.base_path = self.path_base
 
         # the following format will be used for all sockets, except when setting a
@@ -148,7 +160,7 @@ class CompositorNodesOutputRenderedObjects():
         mask_name = f"Backdrop"
         n_output_file.file_slots.new(mask_name)
         s_obj_mask = n_output_file.file_slots[mask_name]
-        s_obj_mask.use_node_format = True
+        self.__setup_mask_format(s_obj_mask, kw.get('bw_masks', False))
         tree.links.new(n_id_mask.outputs['Alpha'], n_output_file.inputs[mask_name])
         self.sockets['s_backdrop'] = s_obj_mask
 
@@ -167,10 +179,20 @@ class CompositorNodesOutputRenderedObjects():
             mask_name = f"Mask{i:03}"
             n_output_file.file_slots.new(mask_name)
             s_obj_mask = n_output_file.file_slots[mask_name]
-            s_obj_mask.use_node_format = True
+            self.__setup_mask_format(s_obj_mask, kw.get('bw_masks', False))
             tree.links.new(n_id_mask.outputs['Alpha'], n_output_file.inputs[mask_name])
             self.sockets[f"s_obj_mask{obj['id_mask']}"] = s_obj_mask
 
+        # optionally keep the object index pass in memory. The active viewer
+        # node stores its input in bpy.data.images['Viewer Node'] after each
+        # render, from which masks can be read without going through disk
+        if kw.get('index_viewer', False):
+            n_viewer = nodes.new('CompositorNodeViewer')
+            n_viewer.use_alpha = False
+            tree.links.new(n_render_layers.outputs['IndexOB'], n_viewer.inputs['Image'])
+            nodes.active = n_viewer
+            self.nodes['n_viewer'] = n_viewer
+
         return self.sockets
 
     # NOTE: this function was called update, but was renamed
@@ -200,21 +222,26 @@ class CompositorNodesOutputRenderedObjects():
         # exception)
 
         # set all members and compute path related specifications
-        self.dirinfo = dirinfo
         self.base_filename = render_filename
-        self.objs = objs
         self.scene = scene
-        # extract paths and update in node
-        self.__extract_pathspec()
-        self.__update_node_paths()
-
-        self.sockets['s_render'].path = os.path.join(self.path_rgb, f'{self.base_filename}.png####')
-        self.sockets['s_depth_map'].path = os.path.join(self.path_range, f'{self.base_filename}.exr####')
-        self.sockets['s_backdrop'].path = os.path.join(self.path_backdrop, f'{self.base_filename}.png####')
+        # extract paths and update in node. These only change with the
+        # directory information, i.e. when switching cameras
+        if dirinfo is not self.dirinfo:
+            self.dirinfo = dirinfo
+            self.__extract_pathspec()
+            self.__update_node_paths()
         # obj_names are used to setup corresponding output files for masks
-        for obj in objs:
-            self.sockets[f's_obj_mask{obj["id_mask"]}'].path = os.path.join(
-                self.path_mask, f'{self.base_filename}{obj["id_mask"]}.png####')
+        if objs is not self.objs:
+            self.objs = objs
+            self.mask_sockets = [(self.sockets[f's_obj_mask{obj["id_mask"]}'], obj['id_mask']) for obj in objs]
+
+        # per frame, only the file names change. Note that all paths end with
+        # a separator, see __extract_pathspec
+        self.sockets['s_render'].path = f'{self.path_rgb}{self.base_filename}.png####'
+        self.sockets['s_depth_map'].path = f'{self.path_range}{self.base_filename}.exr####'
+        self.sockets['s_backdrop'].path = f'{self.path_backdrop}{self.base_filename}.png####'
+        for socket, id_mask in self.mask_sockets:
+            socket.path = f'{self.path_mask}{self.base_filename}{id_mask}.png####'
         return self.sockets
 
     def postprocess(self):
@@ -17,6 +17,7 @@
 # limitations under the License.
 
 import bpy
+import numpy as np
 from mathutils import Vector
 from amira_blender_rendering.utils.blender import clear_orphaned_materials, remove_material_nodes, add_default_material
 from amira_blender_rendering.utils import material as mutil
@@ -29,10 +30,54 @@ from amira_blender_rendering.utils import material as mutil
 #       python-code for us, or loads node setups from a configuration file, or
 #       something along the lines...
 
+# materials whose node tree was already set up, keyed by the pointers of
+# (material, empty). Values are (material, empty, node count after setup)
+_material_cache = {}
+
+# indices of the bounding box corners of the object's top face
+_BBOX_TOP_FACE = [1, 2, 5, 6]
+
+# default input values of the Principled BSDF node
+_BSDF_DEFAULTS = {
+    'Subsurface': 0.6,
+    'Subsurface Color': (0.8, 0.444, 0.444, 1.0),
+    'Metallic': 1.0,
+}
+
+# default input values of the noise texture nodes n_noise0 to n_noise3
+_NOISE_DEFAULTS = (
+    {'Scale': 1.0, 'Detail': 1.0, 'Distortion': 2.0},
+    {'Scale': 300.0, 'Detail': 0.0, 'Distortion': 0.0},
+    {'Scale': 0.0, 'Detail': 0.0, 'Distortion': 0.1},
+    {'Scale': 5.0, 'Detail': 2.0, 'Distortion': 0.0},
+)
+
+
 def setup_material(material: bpy.types.Material, empty: bpy.types.Object = None):
-    """Setup material nodes for the metal tool cap"""
+    """Setup material nodes for the metal tool cap.
+
+    Setting up the same material (with the same empty) more than once is a
+    no-op, i.e. the node tree is built only once.
+    """
     # TODO: refactor into smaller node-creation functions that can be re-used elsewhere
 
+    key = (material.as_pointer(), None if empty is None else empty.as_pointer())
+    cached = _material_cache.pop(key, None)
+    if cached is not None:
+        cached_mat, cached_empty, n_nodes = cached
+        try:
+            # pointers might be re-used after a datablock was removed, and the
+            # node tree might have been modified in the meantime. Only skip
+            # setup if the tree is still the one we built.
+            if cached_mat.as_pointer() == key[0] and \
+                    (cached_empty is None or cached_empty.as_pointer() == key[1]) and \
+                    len(material.node_tree.nodes) == n_nodes:
+                _material_cache[key] = cached
+                return
+        except ReferenceError:
+            # the cached material was removed in the meantime
+            pass
+
     # logger = get_logger()
     tree = material.node_tree
     nodes = tree.nodes
@@ -41,9 +86,7 @@ def setup_material(material: bpy.types.Material, empty: bpy.types.Object = None)
     n_output, n_bsdf = mutil.check_default_material(material)
 
     # set BSDF default values
-    n_bsdf.inputs['Subsurface'].default_value = 0.6
-    n_bsdf.inputs['Subsurface Color'].default_value = (0.8, 0.444, 0.444, 1.0)
-    n_bsdf.inputs['Metallic'].default_value = 1.0
+    mutil.set_input_defaults(n_bsdf, _BSDF_DEFAULTS)
 
     # thin metallic surface lines (used primarily for normal/bump map computation)
     n_texcoord_bump = nodes.new('ShaderNodeTexCoord')
@@ -52,33 +95,22 @@ def setup_material(material: bpy.types.Material, empty: bpy.types.Object = None)
         # get currently selected object
         obj = bpy.context.object
 
-        # add empty
-        bpy.ops.object.empty_add(type='PLAIN_AXES')
-        empty = bpy.context.object
+        # add empty. NOTE: we do not use bpy.ops here to avoid operator overhead
+        #       (context, undo stack, and depsgraph updates)
+        empty = bpy.data.objects.new('Empty', None)
+        empty.empty_display_type = 'PLAIN_AXES'
+        bpy.context.collection.objects.link(empty)
 
-        # locate at the top of the object
-        v0 = Vector(obj.bound_box[1])
-        v1 = Vector(obj.bound_box[2])
-        v2 = Vector(obj.bound_box[5])
-        v3 = Vector(obj.bound_box[6])
-        empty.location = (v0 + v1 + v2 + v3) / 4
+        # locate at the top of the object, i.e. the centroid of the top face of the bounding box
+        empty.location = Vector(np.asarray(obj.bound_box)[_BBOX_TOP_FACE].mean(axis=0))
         # rotate into object space. afterwards we'll have linkage via parenting
         empty.location = obj.matrix_world @ empty.location
         # copy rotation
         empty.rotation_euler = obj.rotation_euler
 
-        # deselect all
-        bpy.ops.object.select_all(action='DESELECT')
-
-        # take care to re-select everything
-        empty.select_set(state=True)
-        obj.select_set(state=True)
-
-        # make obj active again (will become parent of all selected objects)
-        bpy.context.view_layer.objects.active = obj
-
-        # make parent, keep transform
-        bpy.ops.object.parent_set(type='OBJECT', xmirror=False, keep_transform=True)
+        # make parent, keep transform (same as parent_set with keep_transform=True)
+        empty.parent = obj
+        empty.matrix_parent_inverse = obj.matrix_world.inverted()
     # set the empty as input for the texture
     n_texcoord_bump.object = empty
 
@@ -98,28 +130,20 @@ def setup_material(material: bpy.types.Material, empty: bpy.types.Object = None)
 
     # generate and link up required noise textures
     n_noise0 = nodes.new('ShaderNodeTexNoise')
-    n_noise0.inputs['Scale'].default_value = 1.0
-    n_noise0.inputs['Detail'].default_value = 1.0
-    n_noise0.inputs['Distortion'].default_value = 2.0
+    mutil.set_input_defaults(n_noise0, _NOISE_DEFAULTS[0])
     tree.links.new(n_pow.outputs[0], n_noise0.inputs[0])
 
     n_noise1 = nodes.new('ShaderNodeTexNoise')
-    n_noise1.inputs['Scale'].default_value = 300.0
-    n_noise1.inputs['Detail'].default_value = 0.0
-    n_noise1.inputs['Distortion'].default_value = 0.0
+    mutil.set_input_defaults(n_noise1, _NOISE_DEFAULTS[1])
     tree.links.new(n_pow.outputs[0], n_noise1.inputs[0])
 
     # XXX: is this noise required?
     n_noise2 = nodes.new('ShaderNodeTexNoise')
-    n_noise2.inputs['Scale'].default_value = 0.0
-    n_noise2.inputs['Detail'].default_value = 0.0
-    n_noise2.inputs['Distortion'].default_value = 0.1
+    mutil.set_input_defaults(n_noise2, _NOISE_DEFAULTS[2])
     tree.links.new(n_mapping.outputs['Vector'], n_noise2.inputs[0])
 
     n_noise3 = nodes.new('ShaderNodeTexNoise')
-    n_noise3.inputs['Scale'].default_value = 5.0
-    n_noise3.inputs['Detail'].default_value = 2.0
-    n_noise3.inputs['Distortion'].default_value = 0.0
+    mutil.set_input_defaults(n_noise3, _NOISE_DEFAULTS[3])
     tree.links.new(n_mapping.outputs['Vector'], n_noise3.inputs[0])
 
     # color output
@@ -131,8 +155,7 @@ def setup_material(material: bpy.types.Material, empty: bpy.types.Object = None)
     tree.links.new(n_noise0.outputs['Fac'], n_colorramp_col.inputs['Fac'])
 
     n_output_color = nodes.new('ShaderNodeMixRGB')
-    n_output_color.inputs['Fac'].default_value = 0.400
-    n_output_color.inputs['Color1'].default_value = (0.485, 0.485, 0.485, 1.0)
+    mutil.set_input_defaults(n_output_color, {'Fac': 0.400, 'Color1': (0.485, 0.485, 0.485, 1.0)})
     tree.links.new(n_colorramp_col.outputs['Color'], n_output_color.inputs['Color2'])
 
     # roughness finish
@@ -180,8 +203,7 @@ def setup_material(material: bpy.types.Material, empty: bpy.types.Object = None)
     tree.links.new(n_min_n.outputs[0], n_colorramp_rough.inputs[0])
 
     n_output_normal = nodes.new('ShaderNodeBump')
-    n_output_normal.inputs['Strength'].default_value = 0.075
-    n_output_normal.inputs['Distance'].default_value = 1.000
+    mutil.set_input_defaults(n_output_normal, {'Strength': 0.075, 'Distance': 1.000})
     tree.links.new(n_colorramp_rough.outputs['Color'], n_output_normal.inputs['Height'])
 
     # output nodes:
@@ -193,6 +215,8 @@ def setup_material(material: bpy.types.Material, empty: bpy.types.Object = None)
     tree.links.new(n_output_roughness.outputs['Value'], n_bsdf.inputs['Roughness'])
     tree.links.new(n_output_normal.outputs['Normal'], n_bsdf.inputs['Normal'])
 
+    _material_cache[key] = (material, empty, len(nodes))
+
 
 # TODO: this should become a unit test
 def main():
@@ -200,7 +224,7 @@ def main():
     remove_material_nodes()
     clear_orphaned_materials()
     mat = add_default_material()
-    setup_material_metal_tool_cap(mat)
+    setup_material(mat)
 
 
 if __name__ == "__main__":
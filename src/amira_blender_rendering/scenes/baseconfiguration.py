@@ -34,6 +34,12 @@ class BaseConfiguration(Configuration):
         self.add_param('dataset.view_count', 1, 'Number of camera views per scene to generate')
         self.add_param('dataset.base_path', '', 'Path to storage directory')
         self.add_param('dataset.scene_type', '', 'Scene type')
+        self.add_param('dataset.skip_existing', False,
+                       'If True, skip images whose annotations already exist, e.g. to resume an interrupted run')
+        self.add_param('dataset.max_retries', 0,
+                       'Maximum number of attempts to render a scene before skipping it. If 0, retry indefinitely')
+        self.add_param('dataset.seed', -1,
+                       'Seed for the random number generator used to randomize scenes. If negative, do not seed')
 
         # camera configuration
         self.add_param('camera_info.name', 'Pinhole Camera', 'Name for the camera')
@@ -55,8 +61,10 @@ class BaseConfiguration(Configuration):
         self.add_param('render_setup.denoising', True, 'Use denoising algorithms during rendering')
         self.add_param('render_setup.samples', 128, 'Samples to use during rendering')
         self.add_param('render_setup.color_depth', 16, 'Depth for color (RGB) image [16bit, 8bit]. Default: 16')
+        self.add_param('render_setup.bw_masks', False, 'If True, store masks and backdrop as single channel 8bit png instead of RGB with color_depth')
         self.add_param('render_setup.allow_occlusions', False, 'If True, allow objects to be occluded from camera')
         self.add_param('render_setup.motion_blur', False, 'If True, toggle motion blur during rendering. Motion blur specific config must be set directly in the .blend blnderer scene')
+        self.add_param('render_setup.tile_size', 0, 'Size (pixel) of render tiles. Small tiles balance better when multiple workers share a GPU. If 0, keep the value from the .blend file')
 
         # debug
         self.add_param('debug.enabled', False, 'If True, enable debugging. For specifc flags refer to single scenes')
@@ -67,3 +75,5 @@ class BaseConfiguration(Configuration):
         self.add_param('postprocess.parallel_cameras', [], 'Pair of parallel stereo cameras (among scene_setup.cameras) to postprocess')
         self.add_param('postprocess.compute_disparity', False, 'If True, toggle computation of disparity map (from depth) based on given baseline (mm) value')
         self.add_param('postprocess.parallel_cameras_baseline_mm', 0, 'Baseline value (i.e., translation) between parallel cameras locations (in mm). Default: 0')
+        self.add_param('postprocess.bbox_from_index_pass', False, 'If True, compute 2D bounding boxes from the in-memory object index pass instead of reloading masks from disk')
+        self.add_param('postprocess.bbox_from_projection', False, 'If True, compute 2D bounding boxes from the projected 3D bounding boxes instead of the masks (not tight)')
@@ -46,24 +46,56 @@ class BaseSceneManager():
         blnd.clear_all_objects()
         blnd.clear_orphaned_materials()
 
-    def set_environment_texture(self, filepath):
-        """Set a specific environment texture for the scene"""
+    def preload_images(self, filepaths):
+        """Load images into bpy.data.images ahead of time.
+
+        Subsequent calls to set_environment_texture or set_object_texture with
+        any of the given files only swap the image of the texture node.
+
+        Args:
+            filepaths(list(str)): paths to images to load
+
+        Returns:
+            list(bpy.types.Image): the loaded images, missing files are skipped
+        """
+        images = []
+        for filepath in filepaths:
+            if not os.path.exists(filepath):
+                self.logger.warn(f"Path {filepath} to image does not exist. Skipping")
+                continue
+            images.append(blnd.load_img(filepath))
+        self.logger.info(f"Preloaded {len(images)} images")
+        return images
+
+    def set_environment_texture(self, texture):
+        """Set a specific environment texture for the scene
+
+        Args:
+            texture(str or bpy.types.Image): path to the texture image, or an
+                image that was already loaded, e.g. by preload_images
+        """
+        is_image = isinstance(texture, bpy.types.Image)
+
+        # nothing to do if the texture is already set, e.g. when the same
+        # texture is randomly chosen twice in a row
+        tree = bpy.context.scene.world.node_tree
+        nodes = tree.nodes
+        n_envtex = nodes.get('Environment Texture')
+        if n_envtex is not None and n_envtex.image is not None:
+            if (n_envtex.image == texture) if is_image else (n_envtex.image.filepath == texture):
+                return
 
         # check if path exists or not
-        if not os.path.exists(filepath):
-            self.logger.error(f"Path {filepath} to environment texture does not exist.")
+        if not is_image and not os.path.exists(texture):
+            self.logger.error(f"Path {texture} to environment texture does not exist.")
             return
 
         # add new environment texture node if required
-        tree = bpy.context.scene.world.node_tree
-        nodes = tree.nodes
-        if 'Environment Texture' not in nodes:
-            nodes.new('ShaderNodeTexEnvironment')
-        n_envtex = nodes['Environment Texture']
+        if n_envtex is None:
+            n_envtex = nodes.new('ShaderNodeTexEnvironment')
 
         # retrieve image object and set
-        img = blnd.load_img(filepath)
-        n_envtex.image = img
+        n_envtex.image = texture if is_image else blnd.load_img(texture)
 
         # setup link (doesn't matter if already exists, won't duplicate)
         tree.links.new(n_envtex.outputs['Color'], nodes['Background'].inputs['Color'])
@@ -27,13 +27,13 @@ import os
 import pathlib
 from mathutils import Vector
 import numpy as np
-import random
-from math import ceil, log
+import logging
 
 from amira_blender_rendering.utils import camera as camera_utils
 from amira_blender_rendering.utils.io import expandpath
 from amira_blender_rendering.utils.logging import get_logger
-from amira_blender_rendering.dataset import get_environment_textures, build_directory_info, dump_config
+from amira_blender_rendering.dataset import get_environment_textures, build_directory_info, dump_config, \
+    RandomChoice, annotation_exists, format_width, create_directory_tree
 import amira_blender_rendering.scenes as abr_scenes
 import amira_blender_rendering.math.geometry as abr_geom
 import amira_blender_rendering.utils.blender as blnd
@@ -57,6 +57,8 @@ class PandaTableConfiguration(abr_scenes.BaseConfiguration):
                        'Path to .blend file with modeled scene')
         self.add_param('scene_setup.environment_textures', '$AMIRA_DATASETS/OpenImagesV4/Images',
                        'Path to background images / environment textures')
+        self.add_param('scene_setup.preload_environment_textures', False,
+                       'If True, load all environment textures at startup instead of on first use')
         self.add_param('scene_setup.cameras',
                        ['Camera', 'StereoCamera.Left', 'StereoCamera.Right', 'Camera.FrontoParallel.Left',
                         'Camera.FrontoParallel.Right'], 'Cameras to render')
@@ -105,6 +107,15 @@ class PandaTable(interfaces.ABRScene):
         if self.render_mode not in ['default', 'multiview']:
             self.logger.warn(f'render mode "{self.render_mode}" not supported. Falling back to "default"')
             self.render_mode = 'default'
+
+        # range of (static) scenes to render. Used when splitting the dataset among workers
+        self.scene_start = kwargs.get('start', 0)
+        self.scene_stop = kwargs.get('stop', None)
+
+        # random number generator used for scene randomization. If seeded, it
+        # is re-seeded for each scene, see seed_scene
+        seed = self.config.dataset.seed
+        self._rng = np.random.default_rng(None if seed < 0 else seed)
         
         # we might have to post-process the configuration
         self.postprocess_config()
@@ -122,7 +133,8 @@ class PandaTable(interfaces.ABRScene):
             self.config.render_setup.integrator,
             self.config.render_setup.denoising,
             self.config.render_setup.samples,
-            self.config.render_setup.motion_blur)
+            self.config.render_setup.motion_blur,
+            tile_size=self.config.render_setup.tile_size)
 
         # grab environment textures
         self.setup_environment_textures()
@@ -141,6 +153,10 @@ class PandaTable(interfaces.ABRScene):
         self.distractors = self.setup_objects(self.config.scenario_setup.distractor_objects,
                                               bpy_collection='DistractorObjects')
 
+        # blender objects of all targets, in the order of self.objs. Hot loops use
+        # this list instead of looking up obj['bpy'] for every object
+        self.objs_bpy = [obj['bpy'] for obj in self.objs]
+
         # finally, setup the compositor
         self.setup_compositor()
 
@@ -177,9 +193,11 @@ class PandaTable(interfaces.ABRScene):
 
             for part in config[key]:
                 vs = config[key][part]
-                # split strip and make numeric
-                vs = [v.strip() for v in vs.split(',')]
-                vs = [float(v) for v in vs]
+                # already converted, e.g. when the configuration is reused
+                if isinstance(vs, list):
+                    continue
+                # split and make numeric. float() ignores surrounding whitespace
+                vs = [float(v) for v in vs.split(',')]
                 # if single value given, apply to all axis
                 if len(vs) == 1:
                     vs *= 3
@@ -188,6 +206,9 @@ class PandaTable(interfaces.ABRScene):
         _convert_scaling('ply_scale', self.config.parts)
         _convert_scaling('blend_scale', self.config.parts)
 
+        # parse intrinsics once, they might be given as string or list of strings
+        self.config.camera_info.intrinsic = camera_utils.intrinsics_to_list(self.config.camera_info)
+
     def setup_dirinfo(self):
         """Setup directory information for all cameras.
 
@@ -199,6 +220,7 @@ class PandaTable(interfaces.ABRScene):
             # paths are set up as: base_path + CameraName
             camera_base_path = f"{self.config.dataset.base_path}/{cam}"
             dirinfo = build_directory_info(camera_base_path)
+            create_directory_tree(dirinfo)
             self.dirinfos.append(dirinfo)
 
     def setup_scene(self):
@@ -260,15 +282,21 @@ class PandaTable(interfaces.ABRScene):
         be selected elsewhere.
         """
         scene = bpy.context.scene
+        # camera objects by name, used when switching between cameras
+        self._cam_objs = dict()
+        # camera objects might share their camera data. Set it up only once
+        configured = set()
         for cam in self.config.scene_setup.cameras:
             # first get the camera name. This depends on the scene (blend file)
             cam_name = self.get_camera_name(cam)
-            # select the camera. Blender often operates on the active object, to
-            # make sure that this happens here, we select it
-            blnd.select_object(cam_name)
+            self._cam_objs[cam_name] = bpy.data.objects[cam_name]
             # modify camera according to the intrinsics
-            blender_camera = bpy.data.objects[cam_name].data
-            # set the calibration matrix
+            blender_camera = self._cam_objs[cam_name].data
+            if blender_camera.as_pointer() in configured:
+                continue
+            configured.add(blender_camera.as_pointer())
+            # set the calibration matrix. This directly operates on the camera
+            # data, hence the camera does not need to be selected
             camera_utils.set_camera_info(scene, blender_camera, self.config.camera_info)
 
     def setup_objects(self, objects: list, bpy_collection: str = 'TargetObjects'):
@@ -309,6 +337,7 @@ class PandaTable(interfaces.ABRScene):
         #       object_class_id     model type ID (simply incremental numbers)
         #       object_id   instance ID of the object
         #       bpy         blender object reference
+        collection = None
         for class_id, obj_spec in enumerate(objects):
             if obj_spec is None or obj_spec == '':
                 return
@@ -322,18 +351,22 @@ class PandaTable(interfaces.ABRScene):
                 # split off the prefix for all files that we load from blender
                 class_name = class_name[6:]
 
-            # TODO: file loading happens only very late in this loop. This might
-            #       be an issue for large object counts and could be changed to
-            #       load-once copy-often.
+            # load the object only once, either from the proto object in the
+            # scene or from file, and copy it for all further instances
+            src_obj = None
             for j in range(int(obj_count)):
-                # First, deselect everything
-                bpy.ops.object.select_all(action='DESELECT')
-                if is_proto_object:
-                    # duplicate proto-object
-                    blnd.select_object(class_name)
-                    bpy.ops.object.duplicate()
-                    new_obj = bpy.context.object
+                if src_obj is not None:
+                    # copy previously loaded object
+                    new_obj = blnd.copy_object(src_obj)
+                    if not is_proto_object:
+                        new_obj.name = f'{class_name}.{j:03d}'
+                elif is_proto_object:
+                    # copy proto-object
+                    src_obj = bpy.data.objects[class_name]
+                    new_obj = blnd.copy_object(src_obj)
                 else:
+                    # First, deselect everything
+                    blnd.deselect_all()
                     # we need to load this object from file. This could be
                     # either a blender file, or a PLY file
                     blendfile = expandpath(self.config.parts[class_name], check_file=False)
@@ -375,13 +408,16 @@ class PandaTable(interfaces.ABRScene):
                         except KeyError:
                             # log and keep going
                             self.logger.info(f'No ply_scale for obj {class_name} given. Skipping!')
-                
-                # move object to collection: in case of debugging
-                try:
-                    collection = bpy.data.collections[bpy_collection]
-                except KeyError:
-                    collection = bpy.data.collections.new(bpy_collection)
-                    bpy.context.scene.collection.children.link(collection)
+                    src_obj = new_obj
+
+                # move object to collection: in case of debugging. The
+                # collection is looked up (or created) only once
+                if collection is None:
+                    try:
+                        collection = bpy.data.collections[bpy_collection]
+                    except KeyError:
+                        collection = bpy.data.collections.new(bpy_collection)
+                        bpy.context.scene.collection.children.link(collection)
 
                 if new_obj.name not in collection.objects:
                     collection.objects.link(new_obj)
@@ -401,23 +437,32 @@ class PandaTable(interfaces.ABRScene):
 
         # build masks id for compositor of the format _N_M, where N is the model
         # id, and M is the object id
-        w_class = ceil(log(len(obk), 10)) if len(obk) else 0  # format width for number of model types
-        for i, obj in enumerate(objs):
-            w_obj = ceil(log(obk[obj['object_class_name']]['instances'], 10))  # format width for objs with same model
+        w_class = format_width(len(obk))  # format width for number of model types
+        w_objs = {name: format_width(obk[name]['instances']) for name in obk}  # format width for same model
+        for obj in objs:
+            w_obj = w_objs[obj['object_class_name']]
             id_mask = f"_{obj['object_class_id']:0{w_class}}_{obj['object_id']:0{w_obj}}"
             obj['id_mask'] = id_mask
         
         return objs
 
     def setup_compositor(self):
-        self.renderman.setup_compositor(self.objs, color_depth=self.config.render_setup.color_depth)
+        self.renderman.setup_compositor(self.objs, color_depth=self.config.render_setup.color_depth,
+                                        bw_masks=self.config.render_setup.bw_masks,
+                                        index_viewer=self.config.postprocess.bbox_from_index_pass)
 
     def setup_environment_textures(self):
         # get list of environment textures
         self.environment_textures = get_environment_textures(self.config.scene_setup.environment_textures)
+        # when preloading, draw the loaded images directly so that switching
+        # the texture per frame does not need to go through the file path
+        textures = self.environment_textures
+        if self.config.scene_setup.preload_environment_textures:
+            textures = self.renderman.preload_images(textures) or textures
+        self.environment_texture_choice = RandomChoice(textures, rng=self._rng)
 
     def setup_textured_objects(self):
-        # get list of textures
+        # get list of (already expanded) textures
         self.objects_textures = get_environment_textures(self.config.scenario_setup.objects_textures)
         # check whether given objects exists
         for name in self.config.scenario_setup.textured_objects:
@@ -437,8 +482,8 @@ class PandaTable(interfaces.ABRScene):
 
         # we need #objects * (3 + 3)  many random numbers, so let's just grab them all
         # at once
-        rnd = np.random.uniform(size=(len(objs), 3))
-        rnd_rot = np.random.rand(len(objs), 3)
+        rnd = self._rng.random((len(objs), 6))
+        rnd, rnd_rot = rnd[:, :3], rnd[:, 3:]
 
         # now, move each object to a random location (uniformly distributed) in
         # the scenario-dropzone. The location of a drop box is its centroid (as
@@ -446,19 +491,21 @@ class PandaTable(interfaces.ABRScene):
         # along the axis in one direction, i.e. the full extend along this
         # direction is 2 * scale.
         dropbox = f"Dropbox.000"
-        drop_location = bpy.data.objects[dropbox].location
-        drop_scale = bpy.data.objects[dropbox].scale
+        drop_center = np.array(bpy.data.objects[dropbox].location, dtype=np.float64)
+        drop_extent = 2.0 * np.array(bpy.data.objects[dropbox].scale, dtype=np.float64)
+
+        locations = drop_center + (rnd - .5) * drop_extent
+        rotations = rnd_rot * np.pi
 
-        for i, obj in enumerate(objs):
+        log_poses = self.logger.isEnabledFor(logging.DEBUG)
+        for obj, location, rotation in zip(objs, locations.tolist(), rotations.tolist()):
             if obj['bpy'] is None:
                 continue
-        
-            obj['bpy'].location.x = drop_location.x + (rnd[i, 0] - .5) * 2.0 * drop_scale[0]
-            obj['bpy'].location.y = drop_location.y + (rnd[i, 1] - .5) * 2.0 * drop_scale[1]
-            obj['bpy'].location.z = drop_location.z + (rnd[i, 2] - .5) * 2.0 * drop_scale[2]
-            obj['bpy'].rotation_euler = Vector((rnd_rot[i, :] * np.pi))
 
-            self.logger.info(f"Object {obj['object_class_name']}: {obj['bpy'].location}, {obj['bpy'].rotation_euler}")
+            obj['bpy'].location = location
+            obj['bpy'].rotation_euler = rotation
+            if log_poses:
+                self.logger.debug("Object %s: %s, %s", obj['object_class_name'], location, rotation)
 
         # update the scene. unfortunately it doesn't always work to just set
         # the location of the object without recomputing the dependency
@@ -466,26 +513,67 @@ class PandaTable(interfaces.ABRScene):
         dg = bpy.context.evaluated_depsgraph_get()
         dg.update()
 
+    def seed_scene(self, scene_index: int):
+        """Seed the random number generator for a scene.
+
+        The generator is derived from dataset.seed and the scene index. Hence,
+        a scene is randomized the same way, independent of the scenes that were
+        rendered or skipped before it (e.g. by workers or with skip_existing).
+        If dataset.seed is negative, the generator is not re-seeded.
+
+        Args:
+            scene_index(int): index of the scene
+        """
+        seed = self.config.dataset.seed
+        if seed < 0:
+            return
+        self._rng = np.random.default_rng((seed, scene_index))
+        self.environment_texture_choice.reset(self._rng)
+
     def randomize_environment_texture(self):
         # set some environment texture, randomize, and render
-        env_txt_filepath = expandpath(random.choice(self.environment_textures))
+        env_txt_filepath = self.environment_texture_choice()
         self.renderman.set_environment_texture(env_txt_filepath)
 
     def randomize_textured_objects_textures(self):
-        for obj_name in self.config.scenario_setup.textured_objects:
-            obj_txt_filepath = expandpath(random.choice(self.objects_textures))
-            self.renderman.set_object_texture(obj_name, obj_txt_filepath)
+        textured_objects = self.config.scenario_setup.textured_objects
+        if not textured_objects:
+            return
+        # draw from the scene's generator, such that textures follow dataset.seed
+        indices = self._rng.integers(0, len(self.objects_textures), size=len(textured_objects))
+        for obj_name, i in zip(textured_objects, indices.tolist()):
+            self.renderman.set_object_texture(obj_name, self.objects_textures[i])
 
     def forward_simulate(self):
-        self.logger.info(f"forward simulation of {self.config.scene_setup.forward_frames} frames")
+        forward_frames = self.config.scene_setup.forward_frames
+        self.logger.info("forward simulation of %d frames", forward_frames)
         scene = bpy.context.scene
-        for i in range(self.config.scene_setup.forward_frames):
+        if forward_frames <= 0:
+            return
+
+        # without rigid body world there is nothing to simulate, directly jump to the last frame
+        if scene.rigidbody_world is None:
+            scene.frame_set(forward_frames)
+            self.logger.info('forward simulation: done!')
+            return
+
+        # the rigid body solver stops simulating at the end of its point cache.
+        # If the cache of the .blend file is shorter than the requested number
+        # of frames, objects would freeze mid-air. Extend it, and say so
+        point_cache = scene.rigidbody_world.point_cache
+        if point_cache.frame_end < forward_frames:
+            self.logger.warning("extending rigid body cache from %d to %d frames",
+                                point_cache.frame_end, forward_frames)
+            point_cache.frame_end = forward_frames
+
+        # the rigid body solver only advances by one frame at a time. Hence,
+        # all frames need to be set in order
+        for i in range(forward_frames):
             scene.frame_set(i + 1)
-        self.logger.info(f'forward simulation: done!')
+        self.logger.info('forward simulation: done!')
 
     def activate_camera(self, cam_name: str):
-        # first get the camera name. this depends on the scene (blend file)
-        bpy.context.scene.camera = bpy.context.scene.objects[f"{cam_name}"]
+        bpy.context.scene.camera = self._cam_objs[cam_name]
 
     def set_camera_location(self, name, location):
         """
@@ -498,11 +586,11 @@ class PandaTable(interfaces.ABRScene):
         # select camera
         blnd.select_object(name)
         # set pose
-        bpy.data.objects[name].location = location
+        self._cam_objs[name].location = location
 
     def get_camera_name(self, cam_str):
         """Get bpy camera name from camera string in config. This depends on the loaded blend file"""
-        return f"{cam_str}"
+        return cam_str
 
     def test_visibility(self, camera_name: str, locations: np.array):
         """Test whether given camera sees all target objects
@@ -514,7 +602,14 @@ class PandaTable(interfaces.ABRScene):
         """
 
         # grep camera object from name
-        camera = bpy.context.scene.objects[camera_name]
+        scene = bpy.context.scene
+        camera = self._cam_objs[camera_name]
+
+        # these do not change while testing, look them up once
+        view_layer = scene.view_layers['View Layer']
+        render = scene.render
+        width, height = render.resolution_x, render.resolution_y
+        depsgraph = bpy.context.evaluated_depsgraph_get()
 
         # make sure to work with multi-dim array
         if locations.shape == (3,):
@@ -524,21 +619,26 @@ class PandaTable(interfaces.ABRScene):
         for i_loc, location in enumerate(locations):
             camera.location = location
 
+            # cheap frustum test first. Ray cast only objects that might be visible
+            depsgraph.update()
+            outside = abr_geom.test_outside_frustum(self.objs_bpy, camera, render)
+
             any_not_visible_or_occluded = False
-            for obj in self.objs:
-                not_visible_or_occluded = abr_geom.test_occlusion(
-                    bpy.context.scene,
-                    bpy.context.scene.view_layers['View Layer'],
+            for obj, obj_outside in zip(self.objs, outside):
+                not_visible_or_occluded = bool(obj_outside) or abr_geom.test_occlusion(
+                    scene,
+                    view_layer,
                     camera,
                     obj['bpy'],
-                    bpy.context.scene.render.resolution_x,
-                    bpy.context.scene.render.resolution_y,
+                    width,
+                    height,
                     require_all=False,
                     origin_offset=0.01)
                 # store object visibility info
                 obj['visible'] = not not_visible_or_occluded
                 if not_visible_or_occluded:
-                    self.logger.warn(f"object {obj} not visible or occluded")
+                    self.logger.warning("object %s:%s not visible or occluded",
+                                        obj['object_class_name'], obj['object_id'])
             
                 # keep trace if any obj was not visible or occluded
                 any_not_visible_or_occluded = any_not_visible_or_occluded or not_visible_or_occluded
@@ -571,9 +671,24 @@ class PandaTable(interfaces.ABRScene):
         # filename setup
         if self.config.dataset.image_count <= 0:
             return False
-        scn_format_width = int(ceil(log(self.config.dataset.scene_count, 10)))
+
+        # bind values that are used for every rendered image once
+        scene = bpy.context.scene
+        scene_count = self.config.dataset.scene_count
+        view_count = self.config.dataset.view_count
+        cameras = self.config.scene_setup.cameras
+        zeroing = self.config.camera_info.zeroing
+        postprocess_config = self.config.postprocess
+        save_debug = self.config.debug.enabled and self.config.debug.save_to_blend
+        dirinfos = self.dirinfos
+        renderman = self.renderman
+
+        # NOTE: each camera renders view_count locations. Build the format string once
+        scn_format_width = format_width(scene_count)
+        view_format_width = format_width(view_count)
+        base_filename_fmt = f"s{{:0{scn_format_width}}}_v{{:0{view_format_width}}}"
         
-        camera_names = [self.get_camera_name(cam_str) for cam_str in self.config.scene_setup.cameras]
+        camera_names = [self.get_camera_name(cam_str) for cam_str in cameras]
         if self.render_mode == 'default':
             cameras_locations = camera_utils.get_current_cameras_locations(camera_names)
             for cam_name, cam_location in cameras_locations.items():
@@ -581,7 +696,7 @@ class PandaTable(interfaces.ABRScene):
         
         elif self.render_mode == 'multiview':
             cameras_locations, _ = camera_utils.generate_multiview_cameras_locations(
-                num_locations=self.config.dataset.view_count,
+                num_locations=view_count,
                 mode=self.config.multiview_setup.mode,
                 camera_names=camera_names,
                 config=self.config.multiview_setup.mode_config,
@@ -601,7 +716,7 @@ class PandaTable(interfaces.ABRScene):
 
                 for cam_name in camera_names:
                     plot_points(np.array(cameras_locations[cam_name]),
-                                bpy.context.scene.objects[cam_name],
+                                scene.objects[cam_name],
                                 plot_axis=self.config.debug.plot_axis,
                                 scatter=self.config.debug.scatter)
 
@@ -609,19 +724,41 @@ class PandaTable(interfaces.ABRScene):
             if self.config.debug.save_to_blend:
                 for i_cam, cam_name in enumerate(camera_names):
                     self.save_to_blend(
-                        self.dirinfos[i_cam],
+                        dirinfos[i_cam],
                         camera_name=cam_name,
                         camera_locations=cameras_locations[cam_name],
                         basefilename='robottable_camera_locations')
 
+        # visibility debug information is saved at most once per run
+        visibility_debug_saved = False
+
+        # targets and distractors are randomized together
+        transform_objs = self.objs + self.distractors
+
         # control loop for the number of static scenes to render
-        scn_counter = 0
-        while scn_counter < self.config.dataset.scene_count:
+        scn_counter = self.scene_start
+        scn_stop = scene_count
+        if self.scene_stop is not None:
+            scn_stop = min(self.scene_stop, scn_stop)
+        scn_retries = 0
+        while scn_counter < scn_stop:
+
+            # skip scenes that were completely rendered (all cameras and views) in a previous run
+            if self.config.dataset.skip_existing and all(
+                    annotation_exists(dirinfo, base_filename_fmt.format(scn_counter, view_counter))
+                    for dirinfo in dirinfos for view_counter in range(view_count)):
+                self.logger.info('Scene %d/%d already rendered. Skipping', scn_counter + 1, scene_count)
+                scn_counter = scn_counter + 1
+                continue
+
+            # retries of a scene continue with the same generator
+            if scn_retries == 0:
+                self.seed_scene(scn_counter)
 
             # randomize scene: move objects at random locations, and forward simulate physics
             self.randomize_environment_texture()
             self.randomize_textured_objects_textures()
-            self.randomize_object_transforms(self.objs + self.distractors)
+            self.randomize_object_transforms(transform_objs)
             self.forward_simulate()
             
             # check visibility
@@ -629,16 +766,17 @@ class PandaTable(interfaces.ABRScene):
             if not self.config.render_setup.allow_occlusions:
                 for cam_name, cam_locations in cameras_locations.items():
                     repeat_frame = not self.test_visibility(cam_name, cam_locations)
+                    if repeat_frame:
+                        break
 
-            # if we need to repeat (change static scene) we skip one iteration
-            # without increasing the counter
+            # if we need to repeat (change static scene) we skip rendering
+            # without increasing the counter (see below)
             if repeat_frame:
-                self.logger.warn(f'Something wrong. '
-                                 f'Re-randomizing scene {scn_counter + 1}/{self.config.dataset.scene_count}')
-                continue
+                self.logger.warn('Something wrong. Re-randomizing scene %d/%d',
+                                 scn_counter + 1, scene_count)
 
             # loop over cameras
-            for i_cam, cam_str in enumerate(self.config.scene_setup.cameras):
+            for i_cam, cam_str in enumerate(cameras):
                 # get bpy object camera name
                 cam_name = self.get_camera_name(cam_str)
 
@@ -650,21 +788,18 @@ class PandaTable(interfaces.ABRScene):
                 # extract camera locations
                 cam_locations = cameras_locations[cam_name]
                 
-                # compute format width
-                view_format_width = int(ceil(log(len(cam_locations), 10)))
-                
                 # activate camera
                 self.activate_camera(cam_name)
 
                 # loop over locations
                 for view_counter, cam_loc in enumerate(cam_locations):
 
-                    self.logger.info(f"Generating image for camera {cam_str}: "
-                                     f"scene {scn_counter + 1}/{self.config.dataset.scene_count}, "
-                                     f"view {view_counter + 1}/{self.config.dataset.view_count}")
+                    self.logger.info("Generating image for camera %s: scene %d/%d, view %d/%d",
+                                     cam_str, scn_counter + 1, scene_count,
+                                     view_counter + 1, view_count)
 
                     # filename
-                    base_filename = f"s{scn_counter:0{scn_format_width}}_v{view_counter:0{view_format_width}}"
+                    base_filename = base_filename_fmt.format(scn_counter, view_counter)
 
                     # set camera location
                     self.set_camera_location(cam_name, cam_loc)
@@ -675,37 +810,38 @@ class PandaTable(interfaces.ABRScene):
                     # the depsgraph needed to update translation and rotation info
                     all_visible = self.test_visibility(cam_name, cam_loc)
 
-                    if not all_visible:
-                        # if debug is enabled save to blender for debugging
-                        if self.config.debug.enabled and self.config.debug.save_to_blend:
-                            self.save_to_blend(
-                                self.dirinfos[i_cam],
-                                scene_index=scn_counter,
-                                view_index=view_counter,
-                                basefilename='robottable_visibility')
+                    # if debug is enabled save to blender for debugging. With occlusions
+                    # allowed this can happen for most views, hence save only the first one
+                    if not all_visible and save_debug and not visibility_debug_saved:
+                        self.save_to_blend(
+                            dirinfos[i_cam],
+                            scene_index=scn_counter,
+                            view_index=view_counter,
+                            basefilename='robottable_visibility')
+                        visibility_debug_saved = True
 
                     # update path information in compositor
-                    self.renderman.setup_pathspec(self.dirinfos[i_cam], base_filename, self.objs)
+                    renderman.setup_pathspec(dirinfos[i_cam], base_filename, self.objs)
                     
                     # finally, render
-                    self.renderman.render()
+                    renderman.render()
 
                     # postprocess. this will take care of creating additional
                     # information, as well as fix filenames
                     try:
-                        self.renderman.postprocess(
-                            self.dirinfos[i_cam],
+                        renderman.postprocess(
+                            dirinfos[i_cam],
                             base_filename,
-                            bpy.context.scene.camera,
+                            scene.camera,
                             self.objs,
-                            self.config.camera_info.zeroing,
-                            postprocess_config=self.config.postprocess)
+                            zeroing,
+                            postprocess_config=postprocess_config)
                         
-                        if self.config.debug.enabled and self.config.debug.save_to_blend:
+                        if save_debug:
                             # reset frame to 0 and save
-                            bpy.context.scene.frame_set(0)
+                            scene.frame_set(0)
                             self.save_to_blend(
-                                self.dirinfos[i_cam],
+                                dirinfos[i_cam],
                                 scene_index=scn_counter,
                                 view_index=view_counter,
                                 basefilename='robottable')
@@ -713,15 +849,15 @@ class PandaTable(interfaces.ABRScene):
                     except ValueError:
                         self.logger.error(
                             f"\033[1;31mValueError during post-processing. "
-                            f"Re-generating image {scn_counter + 1}/{self.config.dataset.scene_count}\033[0;37m")
+                            f"Re-generating image {scn_counter + 1}/{scene_count}\033[0;37m")
                         repeat_frame = True
 
                         # if requested save to blend files for debugging
-                        if self.config.debug.enabled and self.config.debug.save_to_blend:
+                        if save_debug:
                             self.logger.error('There might be a discrepancy between generated mask and '
                                               'object visibility data. Saving debug info to .blend')
                             self.save_to_blend(
-                                self.dirinfos[i_cam],
+                                dirinfos[i_cam],
                                 scene_index=scn_counter,
                                 view_index=view_counter,
                                 on_error=True,
@@ -729,9 +865,17 @@ class PandaTable(interfaces.ABRScene):
 
                         break
 
-            # update scene counter
+            # update scene counter. Give up on the current scene after too many attempts
             if not repeat_frame:
                 scn_counter = scn_counter + 1
+                scn_retries = 0
+            else:
+                scn_retries = scn_retries + 1
+                if 0 < self.config.dataset.max_retries <= scn_retries:
+                    self.logger.error('Giving up on scene %d/%d after %d attempts. Its data might be incomplete',
+                                      scn_counter + 1, scene_count, scn_retries)
+                    scn_counter = scn_counter + 1
+                    scn_retries = 0
 
         return True
 
@@ -746,5 +890,5 @@ class PandaTable(interfaces.ABRScene):
 
     def teardown(self):
         """Tear down the scene"""
-        # nothing to do
-        pass
+        # wait for pending annotation writes
+        self.renderman.finalize()
@@ -20,16 +20,39 @@
 intermediate steps."""
 
 import bpy
-from mathutils import Vector
+from mathutils import Vector, Euler
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import imageio
 
+# serialize annotations compactly with the fastest json library available
 try:
-    import ujson as json
+    import orjson
+
+    def json_dumps(data):
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+except ModuleNotFoundError:
+    try:
+        import ujson as json
+        json_kwargs = dict()
+    except ModuleNotFoundError:
+        import json
+        json_kwargs = dict(separators=(',', ':'))
+
+    def json_dumps(data):
+        return json.dumps(data, **json_kwargs).encode()
+
+try:
+    import pyspng
 except ModuleNotFoundError:
-    import json
+    pyspng = None
+
+try:
+    from numba import njit
+except ModuleNotFoundError:
+    njit = None
 
 import amira_blender_rendering.utils.camera as camera_utils
 import amira_blender_rendering.utils.blender as blnd
@@ -47,15 +70,86 @@ from amira_blender_rendering.utils.logging import get_logger
 logger = get_logger()
 
 
+def _compute_bboxes(bound_box, matrix_world, world_to_clip, order, res_x, res_y, aabb, oobb, corners):
+    """Numerical core of RenderManager.compute_3dbbox.
+
+    Only uses operations that numba supports without BLAS, such that it can be
+    compiled if numba is available.
+
+    Args:
+        bound_box: (8, 3) bounding box vertices in object coordinates
+        matrix_world: (4, 4) object to world transform
+        world_to_clip: (4, 4) world to clip space transform of the camera
+        order: permutation of the bounding box vertices
+        res_x: render resolution in x
+        res_y: render resolution in y
+        aabb: (9, 3) output array for the aabb
+        oobb: (9, 3) output array for the oobb
+        corners: (9, 2) output array for the projected oobb in pixel coordinates
+
+    Returns:
+        aabb, oobb, corners. In each, the centroid is followed by the
+        reordered vertices
+    """
+    # axis aligned (no object rotation). Centroid first, then the corners
+    # in the order of RenderedObjects
+    aabb[0] = 0.5 * (bound_box[0] + bound_box[6])
+    aabb[1:] = bound_box[order]
+
+    # object aligned (that is, including object rotation). The transform
+    # is affine, so the transformed centroid is the centroid of the oobb
+    for k in range(3):
+        oobb[:, k] = aabb[:, 0] * matrix_world[k, 0] + aabb[:, 1] * matrix_world[k, 1] \
+            + aabb[:, 2] * matrix_world[k, 2] + matrix_world[k, 3]
+
+    # project centroid+vertices and convert to pixel coordinates, see
+    # abr_geom.project_to_pixel_coords
+    hom = np.empty((9, 4))
+    for k in range(4):
+        hom[:, k] = oobb[:, 0] * world_to_clip[k, 0] + oobb[:, 1] * world_to_clip[k, 1] \
+            + oobb[:, 2] * world_to_clip[k, 2] + world_to_clip[k, 3]
+    corners[:, 0] = (res_x - 1) * (hom[:, 0] / hom[:, 3] + 1.0) / +2.0
+    corners[:, 1] = (res_y - 1) * (hom[:, 1] / hom[:, 3] - 1.0) / -2.0
+
+    return aabb, oobb, corners
+
+
+if njit is not None:
+    _compute_bboxes = njit(cache=True)(_compute_bboxes)
+
+
+def _write_bytes(filepath, data):
+    with open(filepath, 'wb') as f:
+        f.write(data)
+
+
 class RenderManager(abr_scenes.BaseSceneManager):
     # NOTE: you must call setup_compositor manually when using this class!
 
+    # permutation from blender's bounding box vertices to RenderedObjects, see compute_3dbbox
+    _BBOX_ORDER = np.array([1, 0, 2, 3, 5, 4, 6, 7])
+
     def __init__(self, unit_conversion=bu_to_mm):
         # this will initialize a BaseSceneManager, which is used for setting
         # environment textures, to reset blender, or to initialize default
         # blender settings
         super(RenderManager, self).__init__()
         self.unit_conversion = unit_conversion
+        # buffer for reading the object index pass from the viewer node
+        self._index_buf = None
+        # frame of the last call to render, see read_index_pass
+        self._render_frame = None
+        # reasons for not using the index pass that were already logged
+        self._index_pass_warnings = set()
+        # disparity directories that were already created
+        self._disparity_dirs = set()
+        # (intrinsics, calibration matrix) by camera data, see get_calibration_matrix
+        self._calibration = dict()
+        # output arrays of compute_3dbbox by object
+        self._bbox_buffers = dict()
+        # annotations are written in the background, see save_annotations
+        self._json_executor = None
+        self._json_futures = []
 
     def postprocess(self, dirinfo, base_filename, camera, objs, zeroing, **kwargs):
         """Postprocessing the scene.
@@ -79,7 +173,7 @@ class RenderManager(abr_scenes.BaseSceneManager):
         postprocess_config = kwargs.get('postprocess_config', abr_scenes.BaseConfiguration().postprocess)
     
         # camera matrix
-        K_cam = np.asarray(camera_utils.get_calibration_matrix(bpy.context.scene, camera.data))
+        K_cam = self.get_calibration_matrix(camera)
 
         # first we update the view-layer to get the updated values in
         # translation and rotation
@@ -95,8 +189,6 @@ class RenderManager(abr_scenes.BaseSceneManager):
         fpath_range = os.path.join(dirinfo.images.range, f'{base_filename}.exr')
 
         # filenames (ranges are stored as true exr values, depth as 16 bit png)
-        if not os.path.exists(dirinfo.images.depth):
-            os.mkdir(dirinfo.images.depth)
         fpath_depth = os.path.join(dirinfo.images.depth, f'{base_filename}.png')
 
         # convert
@@ -117,8 +209,9 @@ class RenderManager(abr_scenes.BaseSceneManager):
             if any([c for c in postprocess_config.parallel_cameras if c in camera.name]):
                 # use precomputed depth if available, otherwise use range map
                 dirpath = os.path.join(dirinfo.images.base_path, 'disparity')
-                if not os.path.exists(dirpath):
-                    os.mkdir(dirpath)
+                if dirpath not in self._disparity_dirs:
+                    os.makedirs(dirpath, exist_ok=True)
+                    self._disparity_dirs.add(dirpath)
                 fpath_disparity = os.path.join(dirpath, f'{base_filename}.png')
                 # compute map
                 camera_utils.compute_disparity_from_z_info(fpath_depth,
@@ -129,12 +222,20 @@ class RenderManager(abr_scenes.BaseSceneManager):
                                                            res_y=bpy.context.scene.render.resolution_y,
                                                            scale=postprocess_config.depth_scale)
 
+        # object index pass to compute masks from, if kept in memory
+        index_pass = self.read_index_pass() if postprocess_config.bbox_from_index_pass else None
+
+        # camera transforms are shared by all objects
+        cam_frame = self.get_camera_frame(camera, zeroing)
+
         # compute bounding boxes and save annotations
         results_gl = ResultsCollection()
         results_cv = ResultsCollection()
         for obj in objs:
             render_result_gl, render_result_cv = self.build_render_result(
-                obj, camera, zeroing, postprocess_config.visibility_from_mask)
+                obj, camera, zeroing, postprocess_config.visibility_from_mask,
+                index_pass=index_pass, cam_frame=cam_frame,
+                bbox_from_projection=postprocess_config.bbox_from_projection)
             if obj['visible']:
                 results_gl.add_result(render_result_gl)
                 results_cv.add_result(render_result_cv)
@@ -145,12 +246,19 @@ class RenderManager(abr_scenes.BaseSceneManager):
             results_cv.add_result(render_result_cv)
         self.save_annotations(dirinfo, base_filename, results_gl, results_cv)
 
-    def setup_renderer(self, integrator: str, enable_denoising: bool, samples: int, motion_blur: bool):
+    def setup_renderer(self, integrator: str, enable_denoising: bool, samples: int, motion_blur: bool,
+                       tile_size: int = 0):
         """Setup blender CUDA rendering, and specify number of samples per pixel to
         use during rendering. If the setting render_setup.samples is not set in the
         configuration, the function defaults to 128 samples per image.
+
+        If the environment variable ABR_CUDA_INDEX is set, rendering is restricted
+        to the CUDA device with the given index. This allows to pin each worker
+        process to its own GPU. If tile_size is larger than 0, render tiles are
+        set to tile_size x tile_size pixels.
         """
-        blnd.activate_cuda_devices()
+        device_index = os.environ.get('ABR_CUDA_INDEX', None)
+        blnd.activate_cuda_devices(None if device_index is None else int(device_index))
         # TODO: this hardcodes cycles, but we want a user to specify this
         bpy.context.scene.render.engine = "CYCLES"
 
@@ -167,6 +275,11 @@ class RenderManager(abr_scenes.BaseSceneManager):
         # set motion blur
         bpy.context.scene.render.use_motion_blur = motion_blur
 
+        # set tile size
+        if tile_size > 0:
+            bpy.context.scene.render.tile_x = tile_size
+            bpy.context.scene.render.tile_y = tile_size
+
         # setup denoising option
         bpy.context.scene.view_layers[0].cycles.use_denoising = enable_denoising
         self.logger.info(f"Denoising enabled" if enable_denoising else f"Denoising disabled")
@@ -185,26 +298,99 @@ class RenderManager(abr_scenes.BaseSceneManager):
         self.compositor.setup_nodes(objs, scene=bpy.context.scene, **kw)
 
     def render(self):
+        # drop the viewer image of the previous render. The compositor creates
+        # a new one if it runs, such that read_index_pass never reads stale pixels
+        img = bpy.data.images.get('Viewer Node')
+        if img is not None:
+            bpy.data.images.remove(img)
+        self._render_frame = bpy.context.scene.frame_current
         bpy.ops.render.render(write_still=False)
 
     def setup_pathspec(self, dirinfo, render_filename: str, objs):
         self.compositor.setup_pathspec(dirinfo, render_filename, objs)
 
-    def convert_units(self, render_result):
-        """Convert render_result units from blender units to target unit"""
+    def to_target_units(self, *values):
+        """Convert values from blender units to target units.
+
+        This is the single place where unit_conversion is applied, see
+        get_camera_frame, build_render_result, and convert_units.
+
+        Args:
+            values: arrays (or None) in blender units
+
+        Returns:
+            tuple of converted values, in the same order
+        """
         if self.unit_conversion is None:
-            return render_result
+            return values
+        return tuple(self.unit_conversion(v) for v in values)
 
-        # convert all relevant units from blender units to target units
+    def convert_units(self, render_result):
+        """Convert render_result units from blender units to target unit"""
         result = render_result
-        result.t = self.unit_conversion(result.t)
-        result.t_cam = self.unit_conversion(result.t_cam)
-        result.aabb = self.unit_conversion(result.aabb)
-        result.oobb = self.unit_conversion(result.oobb)
-
+        result.t, result.t_cam, result.aabb, result.oobb = self.to_target_units(
+            result.t, result.t_cam, result.aabb, result.oobb)
         return result
 
-    def build_render_result(self, obj, camera, zeroing, visibility_from_mask: bool = False):
+    def get_calibration_matrix(self, camera):
+        """Get the calibration matrix K of a camera.
+
+        K is computed once and reused as long as the camera data and all
+        camera and render settings that K depends on (see
+        camera_utils.get_intrinsics) are unchanged.
+
+        Args:
+            camera(bpy.types.Object): camera object
+
+        Returns:
+            np.array(3, 3) calibration matrix. Must not be modified
+        """
+        cam = camera.data
+        render = bpy.context.scene.render
+        intrinsics = (cam.type, cam.lens, cam.sensor_width, cam.sensor_height, cam.sensor_fit,
+                      cam.shift_x, cam.shift_y, render.resolution_x, render.resolution_y,
+                      render.resolution_percentage, render.pixel_aspect_x, render.pixel_aspect_y)
+        cached = self._calibration.get(cam.as_pointer())
+        if cached is not None and cached[0] == intrinsics:
+            return cached[1]
+        K = np.asarray(camera_utils.get_calibration_matrix(bpy.context.scene, cam))
+        self._calibration[cam.as_pointer()] = (intrinsics, K)
+        return K
+
+    def get_camera_frame(self, camera, zeroing):
+        """Compute the camera transforms required to build render results.
+
+        These only depend on the camera, hence they can be computed once and
+        reused for all objects of a frame.
+
+        Args:
+            camera: blender camera object
+            zeroing(np.array): array for zeroing camera rotation (in degrees)
+
+        Returns:
+            dict with camera location, inverse and zeroing rotation (mathutils),
+            camera pose in OpenGL and OpenCV convention (numpy, rotations as
+            WXYZ quaternions, translation in target units), and the world to
+            clip space transform (see abr_geom.get_world_to_clip_matrix)
+        """
+        rotation = camera.matrix_world.to_3x3().normalized()
+        R_cam = np.asarray(rotation)
+        t_cam, = self.to_target_units(np.asarray(camera.matrix_world.to_translation()))
+        # the quaternions are handed to PoseRenderResult as is, which would
+        # otherwise convert the same camera rotation for every object
+        return {
+            'location': camera.matrix_world.to_translation(),
+            'rotation_inv': rotation.inverted(),
+            'rotation_zeroing': Euler(Vector(zeroing) * np.pi / 180).to_matrix(),
+            't_cam': t_cam,
+            'q_cam': abr_geom.rotation_matrix_to_quaternion(R_cam),
+            # in OpenCV format the camera looks towards positive z (rotation of pi around x)
+            'q_cam_cv': abr_geom.rotation_matrix_to_quaternion(R_cam.dot(abr_geom.euler_x_to_matrix(np.pi))),
+            'world_to_clip': abr_geom.get_world_to_clip_matrix(camera, bpy.context.scene.render),
+        }
+
+    def build_render_result(self, obj, camera, zeroing, visibility_from_mask: bool = False, index_pass=None,
+                            cam_frame=None, bbox_from_projection: bool = False):
         """Create render result.
 
         Args:
@@ -215,36 +401,56 @@ class RenderManager(abr_scenes.BaseSceneManager):
             visibility_from_mask(bool): if True, if mask is found empty even if object
                             is visible, visibility info are overwritten and
                             set to false
+            index_pass(np.array): HxW object index pass, see read_index_pass. If given,
+                            the object mask is taken from it instead of from disk
+            cam_frame(dict): camera transforms, see get_camera_frame. Computed if not given
+            bbox_from_projection(bool): if True, the 2D bounding box is computed from the
+                            projected 3D bounding box instead of the mask. Masks are
+                            then not read, and visibility_from_mask has no effect
 
         Returns:
             PoseRenderResult
             """
+        if cam_frame is None:
+            cam_frame = self.get_camera_frame(camera, zeroing)
 
         # create a pose render result. leave image fields empty, they will
         # currenlty not go to the state dict. this is only here to make sure
-        # that we actually get the state dict defined in pose render result
-        t = np.asarray(abr_geom.get_relative_translation(obj['bpy'], camera))
-        R = np.asarray(abr_geom.get_relative_rotation_to_cam_deg(obj['bpy'], camera, Vector(zeroing)).to_matrix())
+        # that we actually get the state dict defined in pose render result.
+        # Relative translation and rotation are computed as in
+        # abr_geom.get_relative_translation and get_relative_rotation_to_cam_deg
+        obj_world = obj['bpy'].matrix_world
+        t = np.asarray(cam_frame['rotation_inv'] @ (obj_world.to_translation() - cam_frame['location']))
+        rel_rotation = cam_frame['rotation_inv'] @ obj_world.to_3x3().normalized()
+        R = np.asarray((cam_frame['rotation_zeroing'] @ rel_rotation).to_euler().to_matrix())
 
         # camera world coordinate transformation
-        t_cam = np.asarray(camera.matrix_world.to_translation())
-        R_cam = np.asarray(camera.matrix_world.to_3x3().normalized())
+        t_cam = cam_frame['t_cam']
+        q_cam = cam_frame['q_cam']
 
         # compute bounding boxes
         corners2d, corners3d, aabb, oobb = None, None, None, None
-        if obj['visible']:
+        if obj['visible'] and bbox_from_projection:
+            aabb, oobb, corners3d = self.compute_3dbbox(obj['bpy'], cam_frame['world_to_clip'])
+            corners2d = self.compute_2dbbox_projected(corners3d)
+        elif obj['visible']:
             # this rises a ValueError if mask info is not correct
-            corners2d = self.compute_2dbbox(obj['fname_mask'])
+            corners2d = self.compute_2dbbox(obj['fname_mask'], index_pass, obj['bpy'].pass_index)
             if corners2d is not None:
-                aabb, oobb, corners3d = self.compute_3dbbox(obj['bpy'])
+                aabb, oobb, corners3d = self.compute_3dbbox(obj['bpy'], cam_frame['world_to_clip'])
             elif visibility_from_mask:
-                logger.warn(f'Given mask found empty. '
-                            f'Overwriting visibility information for obj {obj["object_class_name"]}:{obj["object_id"]}')
+                logger.warning('Given mask found empty. Overwriting visibility information for obj %s:%s',
+                               obj['object_class_name'], obj['object_id'])
                 obj['visible'] = False
             else:
                 self.logger.error('Invalid mask given')
                 raise ValueError('Invalid mask given')
 
+        # convert to desired units. The converted arrays are shared by the
+        # OpenGL and OpenCV results, and the conversion (a scaling) commutes
+        # with gl2cv. Hence, each quantity is converted only once
+        t, aabb, oobb = self.to_target_units(t, aabb, oobb)
+
         render_result_gl = PoseRenderResult(
             object_class_name=obj['object_class_name'],
             object_class_id=obj['object_class_id'],
@@ -262,7 +468,7 @@ class RenderManager(abr_scenes.BaseSceneManager):
             oobb=oobb,
             mask_name=obj['id_mask'],
             visible=obj['visible'],
-            camera_rotation=R_cam,
+            camera_rotation=q_cam,
             camera_translation=t_cam)
 
         # build results in OpenCV format
@@ -272,7 +478,7 @@ class RenderManager(abr_scenes.BaseSceneManager):
         # format it is assumed the camera looks towards positive z (rotation of pi around x)
         # Thus to express the rotation in world coordinate we post-multiply the rotation matrix.
         # However, its position/location wrt to the world coordinate system does not change.
-        R_cam_cv = R_cam.dot(abr_geom.euler_x_to_matrix(np.pi))
+        q_cam_cv = cam_frame['q_cam_cv']
         t_cam_cv = t_cam
 
         render_result_cv = PoseRenderResult(
@@ -292,12 +498,9 @@ class RenderManager(abr_scenes.BaseSceneManager):
             oobb=oobb,
             mask_name=obj['id_mask'],
             visible=obj['visible'],
-            camera_rotation=R_cam_cv,
+            camera_rotation=q_cam_cv,
             camera_translation=t_cam_cv)
 
-        # convert to desired units
-        render_result_gl = self.convert_units(render_result_gl)
-        render_result_cv = self.convert_units(render_result_cv)
         return render_result_gl, render_result_cv
 
     def save_annotations(self, dirinfo, base_filename, results_gl: ResultsCollection, results_cv: ResultsCollection):
@@ -308,62 +511,170 @@ class RenderManager(abr_scenes.BaseSceneManager):
             results_gl(ResultsCollection): collection of <PoseRenderResult> in OpenGL convetion
             results_cv(ResultsCollection): collection of <PoseRenderResult> in OpenCV convetion
         """
-        # check if directory structure is already there
-        for k in dirinfo.annotations:
-            if not os.path.exists(dirinfo.annotations[k]):
-                os.makedirs(dirinfo.annotations[k], exist_ok=True)  # create entire tree if necessary
+        # NOTE: the directory structure was created during setup, see dataset.create_directory_tree
+
+        # files are written by a single background thread, such that writing
+        # overlaps with rendering the next image. A single thread keeps the
+        # order of the files, i.e. the OpenCV annotation is still written
+        # last (see dataset.annotation_exists). Call finalize to wait for all
+        # pending writes
+        if self._json_executor is None:
+            self._json_executor = ThreadPoolExecutor(max_workers=1)
+        # report errors of writes that already finished
+        pending = []
+        for future in self._json_futures:
+            if future.done():
+                future.result()
+            else:
+                pending.append(future)
+        self._json_futures = pending
 
         # first dump to json opengl data
         fname_json = f"{base_filename}.json"
         fpath_json = os.path.join(dirinfo.annotations.opengl, f"{fname_json}")
-        json_data = results_gl.state_dict()
-        with open(fpath_json, 'w') as f:
-            json.dump(json_data, f, indent=0)
+        json_data = json_dumps(results_gl.state_dict())
+        self._json_futures.append(self._json_executor.submit(_write_bytes, fpath_json, json_data))
 
         # second dump to json opencv data
         fpath_json = os.path.join(dirinfo.annotations.opencv, f'{fname_json}')
-        json_data = results_cv.state_dict()
-        with open(fpath_json, 'w') as f:
-            json.dump(json_data, f, indent=0)
+        json_data = json_dumps(results_cv.state_dict())
+        self._json_futures.append(self._json_executor.submit(_write_bytes, fpath_json, json_data))
 
         # create xml annotation files according to PASCAL VOC format
         # TODO: this should be an option or convert afterwards. Not everyone wants to convert to PASCAL_VOC
         # to_PASCAL_VOC(fpath_json)
 
-    def compute_2dbbox(self, fname_mask):
+    def finalize(self):
+        """Wait until all annotations are written, and raise errors that
+        occurred while writing them"""
+        if self._json_executor is None:
+            return
+        self._json_executor.shutdown(wait=True)
+        self._json_executor = None
+        futures, self._json_futures = self._json_futures, []
+        for future in futures:
+            future.result()
+
+    def compute_2dbbox_projected(self, corners3d):
+        """Compute the 2D bounding box around the projected 3D bounding box of an object.
+
+        This box is not tight, as it encloses the projected object oriented
+        bounding box instead of the object's silhouette. In turn, it does not
+        require the object mask.
+
+        Args:
+            corners3d(np.array): (9, 2) projected centroid and corners, see compute_3dbbox
+
+        Returns:
+            array(2,2): 2d bbox corners [[left, top], [right, bottom]], clipped to the image
+        """
+        render = bpy.context.scene.render
+        upper = (render.resolution_x - 1, render.resolution_y - 1)
+        left_top = np.clip(np.floor(corners3d[1:].min(axis=0)), 0, upper)
+        right_bottom = np.clip(np.ceil(corners3d[1:].max(axis=0)), 0, upper)
+        return np.array([left_top, right_bottom], dtype=int)
+
+    def read_index_pass(self):
+        """Read the object index pass of the last render from the viewer node.
+
+        This requires the compositor to be set up with index_viewer=True, and
+        the image to be rendered via render. The viewer image is only used if it
+        was produced by the last render, for the current frame and at the
+        current render size. Otherwise, a warning is logged and None is
+        returned, such that masks are loaded from disk. The pixel buffer is
+        reused across calls.
+
+        Returns:
+            HxW float32 array of object pass indices, with the first row at the
+            top of the image, or None if the viewer image is not available.
+        """
+        render = bpy.context.scene.render
+        scale = render.resolution_percentage / 100.0
+        expected_size = (int(render.resolution_x * scale), int(render.resolution_y * scale))
+
+        img = bpy.data.images.get('Viewer Node')
+        if img is None:
+            reason = 'the last render did not produce a viewer image'
+        elif self._render_frame != bpy.context.scene.frame_current:
+            reason = 'the frame changed since the last render'
+        elif tuple(img.size) != expected_size:
+            reason = f'viewer image size {tuple(img.size)} does not match render size {expected_size}'
+        else:
+            reason = None
+        if reason is not None:
+            if reason not in self._index_pass_warnings:
+                self._index_pass_warnings.add(reason)
+                logger.warning('Object index pass not available (%s). Loading masks from disk', reason)
+            return None
+
+        width, height = expected_size
+
+        if self._index_buf is None or self._index_buf.size != width * height * 4:
+            self._index_buf = np.empty(width * height * 4, dtype=np.float32)
+        img.pixels.foreach_get(self._index_buf)
+        # blender stores pixels bottom row first
+        return self._index_buf.reshape(height, width, 4)[::-1, :, 0]
+
+    def compute_2dbbox(self, fname_mask, index_pass=None, pass_index=None):
         """Compute the 2D bounding box around an object given the mask filename
 
-        This simply loads the file from disk and gets the pixels. Unfortunately,
-        it is not possible right now to work around this with using blender's
-        viewer nodes. That is, using a viewer node attached to ID Mask nodes
-        will store an image only to bpy.data.Images['Viewer Node'], depending on
-        which node is currently selected in the node editor... I have yet to find a
-        programmatic way that circumvents re-loading the file from disk
+        This simply loads the file from disk and gets the pixels. A single
+        viewer node cannot capture all ID Mask nodes at once. However, a viewer
+        node attached to the object index pass keeps all masks in memory, see
+        read_index_pass. If such an index pass is given, the mask is taken from
+        it and the file is not loaded.
 
         Args:
             fname_mask(str): mask filename
 
+        Opt Args:
+            index_pass(np.array): HxW object index pass
+            pass_index(int): pass index of the object in index_pass
+
         Raises:
             ValueError if an empty mask is given
         """
-        # this is a HxWx3 tensor (RGBA or RGB data)
-        mask = imageio.imread(fname_mask)
-        mask = np.sum(mask, axis=2)
-        return boundingbox_from_mask(mask)
+        if index_pass is not None:
+            return boundingbox_from_mask(index_pass == pass_index)
+        return boundingbox_from_mask(self.load_mask(fname_mask))
 
-    def reorder_bbox(self, aabb, order=[1, 0, 2, 3, 5, 4, 6, 7]):
-        """Reorder the vertices in an aab according to a certain permutation order."""
+    def load_mask(self, fname_mask):
+        """Load a single channel mask from disk.
 
-        if len(aabb) != 8:
-            raise RuntimeError(f'Unexpected length of aabb (is {len(aabb)}, should be 8)')
+        Args:
+            fname_mask(str): mask filename
+
+        Returns:
+            HxW mask array
+        """
+        # this is a HxWx3 tensor (RGBA or RGB data). Masks are grey values,
+        # hence a view on a single channel suffices. If available, decode
+        # directly with libspng instead of going through imageio's plugins
+        if pyspng is not None:
+            with open(fname_mask, 'rb') as f:
+                mask = pyspng.load(f.read())
+        else:
+            mask = imageio.imread(fname_mask)
+        if mask.ndim == 3:
+            mask = mask[..., 0]
+        return mask
 
-        result = list()
-        for i in range(8):
-            result.append(aabb[order[i]])
+    def reorder_bbox(self, aabb, order=None):
+        """Reorder the vertices in an aab according to a certain permutation order.
 
-        return result
+        Args:
+            aabb: (8, 3) array or list of bounding box vertices
+
+        Opt Args:
+            order: permutation of the vertices. Default: order of RenderedObjects, see compute_3dbbox
 
-    def compute_3dbbox(self, obj: bpy.types.Object):
+        Returns:
+            (8, 3) array with reordered vertices
+        """
+        assert len(aabb) == 8, f'Unexpected length of aabb (is {len(aabb)}, should be 8)'
+        return np.asarray(aabb)[self._BBOX_ORDER if order is None else order]
+
+    def compute_3dbbox(self, obj: bpy.types.Object, world_to_clip=None):
         """Compute all 3D bounding boxes (axis aligned, object oriented, and the 3D corners
 
         Blender has the coordinates and bounding box in the following way.
@@ -384,57 +695,32 @@ class RenderManager(abr_scenes.BaseSceneManager):
         This differs from the order of the bounding box as it was used in
         OpenGL. Ignoring the first item (centroid), the following re-indexing is
         required to get it into the correct order: [1, 0, 2, 3, 5, 4, 6, 7].
-        This will be done after getting the aabb from blender, using function
-        reorder_bbox.
+        This will be done after getting the aabb from blender, see reorder_bbox.
+
+        Args:
+            obj(bpy.types.Object): object to compute bounding boxes for
 
-        TODO: probably, using numpy is not at all required, we could directly
-              store to lists. have to decide if we want this or not
+        Opt Args:
+            world_to_clip(np.array): (4, 4) transform of the camera used to project the
+                corners. Default: transform of the scene camera
+
+        Returns:
+            (9, 3) aabb, (9, 3) oobb, (9, 2) projected oobb corners. Note that
+            these arrays are reused when calling this function again for the
+            same object. Copy them if they need to outlive the current frame
         """
 
-        # 0. storage for numpy arrays.
-        np_aabb = np.zeros((9, 3))
-        np_oobb = np.zeros((9, 3))
-        np_corners3d = np.zeros((9, 2))
-
-        # 1. get centroid and bounding box of object in world coordinates by
-        # applying the objects rotation matrix to the bounding box of the object
-
-        # axis aligned (no object rotation)
-        aabb = [Vector(v) for v in obj.bound_box]
-        # compute centroid
-        aa_centroid = aabb[0] + (aabb[6] - aabb[0]) / 2.0
-        # copy aabb before reordering to have access to it later
-        aabb_orig = aabb
-        # fix order of aabb for RenderedObjects
-        aabb = self.reorder_bbox(aabb)
-        # convert to numpy
-        np_aabb[0, :] = np.array((aa_centroid[0], aa_centroid[1], aa_centroid[2]))
-        for i in range(8):
-            np_aabb[i + 1, :] = np.array((aabb[i][0], aabb[i][1], aabb[i][2]))
-
-        # object aligned (that is, including object rotation)
-        oobb = [obj.matrix_world @ v for v in aabb_orig]
-        # compute oo centroid
-        oo_centroid = oobb[0] + (oobb[6] - oobb[0]) / 2.0
-        # fix order for rendered objects
-        oobb = self.reorder_bbox(oobb)
-
-        # convert to numpy
-        np_oobb[0, :] = np.array((oo_centroid[0], oo_centroid[1], oo_centroid[2]))
-        for i in range(8):
-            np_oobb[i + 1, :] = np.array((oobb[i][0], oobb[i][1], oobb[i][2]))
-
-        # project centroid+vertices and convert to pixel coordinates
-        corners3d = []
-        prj = abr_geom.project_p3d(oo_centroid, bpy.context.scene.camera)
-        pix = abr_geom.p2d_to_pixel_coords(prj)
-        corners3d.append(pix)
-        np_corners3d[0, :] = np.array((corners3d[-1][0], corners3d[-1][1]))
-
-        for i, v in enumerate(oobb):
-            prj = abr_geom.project_p3d(v, bpy.context.scene.camera)
-            pix = abr_geom.p2d_to_pixel_coords(prj)
-            corners3d.append(pix)
-            np_corners3d[i + 1, :] = np.array((corners3d[-1][0], corners3d[-1][1]))
-
-        return np_aabb, np_oobb, np_corners3d
+        render = bpy.context.scene.render
+        if world_to_clip is None:
+            world_to_clip = abr_geom.get_world_to_clip_matrix(bpy.context.scene.camera, render)
+
+        buffers = self._bbox_buffers.get(obj.name)
+        if buffers is None:
+            buffers = (np.empty((9, 3)), np.empty((9, 3)), np.empty((9, 2)))
+            self._bbox_buffers[obj.name] = buffers
+
+        return _compute_bboxes(np.array(obj.bound_box, dtype=np.float64),
+                               np.array(obj.matrix_world, dtype=np.float64),
+                               world_to_clip, self._BBOX_ORDER,
+                               float(render.resolution_x), float(render.resolution_y),
+                               *buffers)
@@ -21,14 +21,13 @@ import bpy
 import os
 from mathutils import Vector, Matrix
 import pathlib
-from math import ceil, log
-import random
 import numpy as np
 
 from amira_blender_rendering.utils import camera as camera_utils
 from amira_blender_rendering.utils.io import expandpath
 from amira_blender_rendering.utils.logging import get_logger
-from amira_blender_rendering.dataset import get_environment_textures, build_directory_info, dump_config
+from amira_blender_rendering.dataset import get_environment_textures, build_directory_info, dump_config, \
+    RandomChoice, annotation_exists, format_width, create_directory_tree
 import amira_blender_rendering.utils.blender as blnd
 import amira_blender_rendering.nodes as abr_nodes
 import amira_blender_rendering.scenes as abr_scenes
@@ -46,6 +45,8 @@ class SimpleObjectConfiguration(abr_scenes.BaseConfiguration):
         # scene specific configuration
         # let's be able to specify environment textures
         self.add_param('scene_setup.environment_textures', '$AMIRA_DATASETS/OpenImagesV4/Images', 'Path to background images / environment textures')
+        self.add_param('scene_setup.preload_environment_textures', False,
+                       'If True, load all environment textures at startup instead of on first use')
         self.add_param('scenario_setup.target_object', 'Tool.Cap', 'Define single target object to render')
         self.add_param('scenario_setup.object_material', 'metal', 'Select object material ["plastic", "metal"]')
 
@@ -71,6 +72,15 @@ class SimpleObject(interfaces.ABRScene):
             self.logger.warn(f'{self.__class__} scene supports only "default" render mode. Falling back to "default"')
             self.render_mode = 'default'
 
+        # range of images to render. Used when splitting the dataset among workers
+        self.scene_start = kwargs.get('start', 0)
+        self.scene_stop = kwargs.get('stop', None)
+
+        # random number generator used for scene randomization. If seeded, it
+        # is re-seeded for each image, see seed_scene
+        seed = self.config.dataset.seed
+        self._rng = np.random.default_rng(None if seed < 0 else seed)
+
         # we might have to post-process the configuration
         self.postprocess_config()
 
@@ -86,7 +96,8 @@ class SimpleObject(interfaces.ABRScene):
             self.config.render_setup.integrator,
             self.config.render_setup.denoising,
             self.config.render_setup.samples,
-            self.config.render_setup.motion_blur)
+            self.config.render_setup.motion_blur,
+            tile_size=self.config.render_setup.tile_size)
 
         # setup environment texture information
         self.setup_environment_textures()
@@ -130,9 +141,11 @@ class SimpleObject(interfaces.ABRScene):
 
             for part in config[key]:
                 vs = config[key][part]
-                # split strip and make numeric
-                vs = [v.strip() for v in vs.split(',')]
-                vs = [float(v) for v in vs]
+                # already converted, e.g. when the configuration is reused
+                if isinstance(vs, list):
+                    continue
+                # split and make numeric. float() ignores surrounding whitespace
+                vs = [float(v) for v in vs.split(',')]
                 # if single value given, apply to all axis
                 if len(vs) == 1:
                     vs *= 3
@@ -141,6 +154,9 @@ class SimpleObject(interfaces.ABRScene):
         _convert_scaling('ply_scale', self.config.parts)
         _convert_scaling('blend_scale', self.config.parts)
 
+        # parse intrinsics once, they might be given as string or list of strings
+        self.config.camera_info.intrinsic = camera_utils.intrinsics_to_list(self.config.camera_info)
+
     def setup_render_output(self):
         # setup render output dimensions. This is not set for a specific camera,
         # but in renders render environment
@@ -165,6 +181,7 @@ class SimpleObject(interfaces.ABRScene):
         """Setup directory information."""
         # For this simple scene, there is just one dirinfo required
         self.dirinfo = build_directory_info(self.config.dataset.base_path)
+        create_directory_tree(self.dirinfo)
 
     def setup_scene(self):
         """Setup the scene. """
@@ -227,11 +244,19 @@ class SimpleObject(interfaces.ABRScene):
     def setup_compositor(self):
         # we let renderman handle the compositor. For this, we need to pass in a
         # list of objects
-        self.renderman.setup_compositor(self.objs, color_depth=self.config.render_setup.color_depth)
+        self.renderman.setup_compositor(self.objs, color_depth=self.config.render_setup.color_depth,
+                                        bw_masks=self.config.render_setup.bw_masks,
+                                        index_viewer=self.config.postprocess.bbox_from_index_pass)
 
     def setup_environment_textures(self):
         # get list of environment textures
         self.environment_textures = get_environment_textures(self.config.scene_setup.environment_textures)
+        # when preloading, draw the loaded images directly so that switching
+        # the texture per frame does not need to go through the file path
+        textures = self.environment_textures
+        if self.config.scene_setup.preload_environment_textures:
+            textures = self.renderman.preload_images(textures) or textures
+        self.environment_texture_choice = RandomChoice(textures, rng=self._rng)
 
     def _rescale_object(self, scale):
         try:
@@ -243,7 +268,7 @@ class SimpleObject(interfaces.ABRScene):
 
     def _import_object(self):
         """Import the mesh of the cap from a ply file."""
-        bpy.ops.object.select_all(action='DESELECT')
+        blnd.deselect_all()
         class_name = expandpath(self.config.scenario_setup.target_object)
         blendfile = expandpath(self.config.parts[class_name], check_file=False)
         # try blender file
@@ -296,8 +321,8 @@ class SimpleObject(interfaces.ABRScene):
         ok = False
         while not ok:
             # random R,t
-            self.obj.location = Vector((1.0 * np.random.rand(3) - 0.5))
-            self.obj.rotation_euler = Vector((np.random.rand(3) * np.pi))
+            self.obj.location = Vector((1.0 * self._rng.random(3) - 0.5))
+            self.obj.rotation_euler = Vector((self._rng.random(3) * np.pi))
 
             # update the scene. unfortunately it doesn't always work to just set
             # the location of the object without recomputing the dependency
@@ -308,9 +333,26 @@ class SimpleObject(interfaces.ABRScene):
             # should lie outside the visible pixel-space
             ok = self._test_obj_visibility()
 
+    def seed_scene(self, image_index: int):
+        """Seed the random number generator for an image.
+
+        The generator is derived from dataset.seed and the image index. Hence,
+        an image is randomized the same way, independent of the images that were
+        rendered or skipped before it (e.g. by workers or with skip_existing).
+        If dataset.seed is negative, the generator is not re-seeded.
+
+        Args:
+            image_index(int): index of the image
+        """
+        seed = self.config.dataset.seed
+        if seed < 0:
+            return
+        self._rng = np.random.default_rng((seed, image_index))
+        self.environment_texture_choice.reset(self._rng)
+
     def randomize_environment_texture(self):
         # set some environment texture, randomize, and render
-        env_txt_filepath = expandpath(random.choice(self.environment_textures))
+        env_txt_filepath = self.environment_texture_choice()
         self.renderman.set_environment_texture(env_txt_filepath)
 
     def set_pose(self, pose):
@@ -365,39 +407,66 @@ class SimpleObject(interfaces.ABRScene):
         image_count = self.config.dataset.image_count
         if image_count <= 0:
             return False
-        format_width = int(ceil(log(image_count, 10)))
+        scn_format_width = format_width(image_count)
+        base_filename_fmt = f"s{{:0{scn_format_width}}}_v0"
 
-        i = 0
-        while i < self.config.dataset.image_count:
+        # bind values that are used for every rendered image once
+        scene = bpy.context.scene
+        zeroing = self.config.camera_info.zeroing
+        postprocess_config = self.config.postprocess
+        dirinfo = self.dirinfo
+        renderman = self.renderman
+
+        i = self.scene_start
+        stop = image_count if self.scene_stop is None else min(self.scene_stop, image_count)
+        retries = 0
+        while i < stop:
             # generate render filename: adhere to naming convention
-            base_filename = f"s{i:0{format_width}}_v0"
+            base_filename = base_filename_fmt.format(i)
+
+            # skip images that were rendered in a previous run
+            if self.config.dataset.skip_existing and annotation_exists(dirinfo, base_filename):
+                self.logger.info('Image %d/%d already rendered. Skipping', i + 1, image_count)
+                i = i + 1
+                continue
+
+            # retries of an image continue with the same generator
+            if retries == 0:
+                self.seed_scene(i)
 
             # randomize environment and object transform
             self.randomize_environment_texture()
             self.randomize_object_transforms()
 
             # setup render managers' path specification
-            self.renderman.setup_pathspec(self.dirinfo, base_filename, self.objs)
+            renderman.setup_pathspec(dirinfo, base_filename, self.objs)
 
             # render the image
-            self.renderman.render()
+            renderman.render()
 
             # try to postprocess. This might fail, in which case we should
             # attempt to re-render the scene with different randomization
             try:
-                self.renderman.postprocess(
-                    self.dirinfo,
+                renderman.postprocess(
+                    dirinfo,
                     base_filename,
-                    bpy.context.scene.camera,
+                    scene.camera,
                     self.objs,
-                    self.config.camera_info.zeroing,
-                    postprocess_config=self.config.postprocess)
+                    zeroing,
+                    postprocess_config=postprocess_config)
             except ValueError:
-                self.logger.warn("ValueError during post-processing, re-generating image index {i}")
+                self.logger.warn("ValueError during post-processing, re-generating image index %d", i)
+                retries = retries + 1
+                if 0 < self.config.dataset.max_retries <= retries:
+                    self.logger.error("Giving up on image index %d after %d attempts", i, retries)
+                    i = i + 1
+                    retries = 0
             else:
                 i = i + 1
+                retries = 0
 
         return True
 
     def teardown(self):
-        pass
+        # wait for pending annotation writes
+        self.renderman.finalize()
@@ -22,6 +22,10 @@ from mathutils import Vector
 from amira_blender_rendering.utils.logging import get_logger
 
 
+# images loaded via load_img, keyed by filepath
+_image_cache = {}
+
+
 def get_collection_item_names(bpy_collection):
     """Get names of current items in a blender collection, e.g. object names in bpy.data.objects
 
@@ -72,8 +76,13 @@ def disable_nodes(scene):
     remove_nodes(scene)
 
 
-def activate_cuda_devices():
-    """This function tries to activate all CUDA devices for rendering"""
+def activate_cuda_devices(device_index: int = None):
+    """This function tries to activate all CUDA devices for rendering
+
+    Args:
+        device_index(int): if given, only activate the CUDA device with this index
+            (counting CUDA devices only). Default: None, i.e. activate all devices
+    """
 
     # get cycles preferences
     cycles = bpy.context.preferences.addons['cycles']
@@ -91,14 +100,19 @@ def activate_cuda_devices():
     if not cuda_available:
         get_logger().warn("No CUDA compute device available, will use CPU")
     else:
-        device_set = False  # FIXME: unused variable
+        cuda_index = 0
         for d in prefs.devices:
             if d.type == 'CUDA':
-                get_logger().info(f"Using CUDA device '{d.name}' ({d.id})")
-                d.use = True
+                d.use = device_index is None or cuda_index == device_index
+                if d.use:
+                    get_logger().info(f"Using CUDA device '{d.name}' ({d.id})")
+                cuda_index += 1
             else:
                 d.use = False
 
+        if device_index is not None and device_index >= cuda_index:
+            get_logger().warn(f"CUDA device index {device_index} out of range, {cuda_index} devices available")
+
         # using the current scene, enable GPU Compute for rendering
         bpy.context.scene.cycles.device = 'GPU'
 
@@ -131,6 +145,17 @@ def clear_orphaned_materials():
         bpy.data.materials.remove(mat)
 
 
+def deselect_all():
+    """Deselect all objects.
+
+    In contrast to bpy.ops.object.select_all(action='DESELECT'), this only
+    touches objects that are currently selected and does not go through the
+    operator machinery.
+    """
+    for obj in bpy.context.selected_objects:
+        obj.select_set(False)
+
+
 def select_object(obj_name: str):
     """Select and activate an object given its name"""
     if obj_name not in bpy.data.objects:
@@ -138,7 +163,7 @@ def select_object(obj_name: str):
         return
 
     # we first deselect all, then select and activate the target object
-    bpy.ops.object.select_all(action='DESELECT')
+    deselect_all()
     obj = bpy.data.objects[obj_name]
     obj.select_set(True)
     bpy.context.view_layer.objects.active = obj
@@ -165,6 +190,28 @@ def add_default_material(
     return mat
 
 
+def copy_object(obj: bpy.types.Object, linked_data: bool = False) -> bpy.types.Object:
+    """Copy an object without using operators.
+
+    Similar to bpy.ops.object.duplicate, the copy is linked to all collections
+    of the original object (including, e.g., the rigid body world collection).
+
+    Args:
+        obj (bpy.types.Object): object to copy
+        linked_data (bool): if True, the copy shares its data (e.g. mesh) with
+            the original object. Default: False
+
+    Returns:
+        bpy.types.Object: copy of the object
+    """
+    new_obj = obj.copy()
+    if not linked_data and obj.data is not None:
+        new_obj.data = obj.data.copy()
+    for collection in obj.users_collection:
+        collection.objects.link(new_obj)
+    return new_obj
+
+
 def import_object(blendfile : str, obj : str):
     """Import an object from a blender Library file to the currently loaded file.
 
@@ -251,10 +298,23 @@ def load_img(filepath):
 
     Returns:
         bpy.types.Image"""
+    img = _image_cache.get(filepath, None)
+    if img is not None:
+        try:
+            # accessing a removed datablock raises a ReferenceError
+            if img.filepath == filepath:
+                return img
+        except ReferenceError:
+            pass
+        del _image_cache[filepath]
+
     for img in bpy.data.images:
         if img.filepath == filepath:
-            return img
-    return bpy.data.images.load(filepath)
+            break
+    else:
+        img = bpy.data.images.load(filepath)
+    _image_cache[filepath] = img
+    return img
 
 
 class Range1D():
@@ -19,6 +19,7 @@
 import bpy
 from mathutils import Vector, Matrix
 from math import radians, atan2
+from functools import lru_cache
 import numpy as np
 import cv2
 
@@ -64,10 +65,40 @@ def get_calibration_matrix(scene, cam):
     return K
 
 
+@lru_cache(maxsize=32)
+def _parse_csv(values: str):
+    """Parse a string of comma separated values to a tuple of floats"""
+    return tuple(float(v) for v in values.split(',') if v.strip() != '')
+
+
+def _csv_to_numpy(values: str, dtype=np.float64):
+    """Convert a string of comma separated values to a numpy array.
+
+    This replaces the deprecated np.fromstring(values, sep=','). Parsing is
+    cached, such that the same intrinsics/location strings are only parsed
+    once. A new array is returned on every call.
+    """
+    return np.array(_parse_csv(values), dtype=dtype)
+
+
+def intrinsics_to_list(camera_info):
+    """Convert the configuration values of `camera_info.intrinsic` to a list of floats.
+
+    Returns:
+        list: fx, fy, cx, cy, or an empty list if no intrinsics are given
+    """
+    if isinstance(camera_info.intrinsic, str):
+        return list(_parse_csv(camera_info.intrinsic))
+    elif isinstance(camera_info.intrinsic, list):
+        return [float(v) for v in camera_info.intrinsic]
+    else:
+        return []
+
+
 def _intrinsics_to_numpy(camera_info):
     """Convert the configuration values of `camera_info.intrinsics` to a numpy format"""
     if isinstance(camera_info.intrinsic, str):
-        return np.fromstring(camera_info.intrinsic, sep=',', dtype=np.float32)
+        return _csv_to_numpy(camera_info.intrinsic, dtype=np.float32)
     elif isinstance(camera_info.intrinsic, list):
         if len(camera_info.intrinsic) == 0:
             return None
@@ -498,7 +529,7 @@ def generate_multiview_cameras_locations(num_locations: int, mode: str, camera_n
         if isinstance(p, str):
             if p == '':
                 return default
-            p = np.fromstring(p, sep=',')
+            p = _csv_to_numpy(p)
         return p
 
     def get_list_from_str(cfg, name, default):
@@ -559,8 +590,8 @@ def generate_multiview_cameras_locations(num_locations: int, mode: str, camera_n
         }
     }
 
-    # generate locations according to selected mode
-    locations = _available_modes[mode](num_locations, **_modes_cfgs[mode])
+    # generate locations according to selected mode, as a single (num_locations, 3) array
+    locations = np.asarray(_available_modes[mode](num_locations, **_modes_cfgs[mode]), dtype=np.float64)
 
     # iterate over cameras
     cameras_locations = {}
@@ -571,9 +602,11 @@ def generate_multiview_cameras_locations(num_locations: int, mode: str, camera_n
         logger.info(f'Generating locations for {cam_name} according to {mode} mode')
         
         # get location
-        # NOTE: need to copy otherwise we overwrite the array being mutable
-        cameras_locations[cam_name] = np.copy(locations)
+        # NOTE: need to copy otherwise cameras share the same (mutable) array.
+        #       Offsetting broadcasts the original location over all locations at once
         if offset:
-            cameras_locations[cam_name] += np.copy(original_locations[cam_name])
+            cameras_locations[cam_name] = locations + original_locations[cam_name]
+        else:
+            cameras_locations[cam_name] = np.copy(locations)
 
     return cameras_locations, original_locations
@@ -28,6 +28,18 @@ from amira_blender_rendering.utils.blender import get_collection_item_names, fin
 logger = get_logger()
 
 
+def set_input_defaults(node: bpy.types.Node, defaults: dict):
+    """Set the default values of (multiple) inputs of a node.
+
+    Args:
+        node(bpy.types.Node): node to modify
+        defaults(dict): default values, keyed by input name or index
+    """
+    inputs = node.inputs
+    for k, v in defaults.items():
+        inputs[k].default_value = v
+
+
 def check_default_material(material: bpy.types.Material):
     """This function checks if, given a material, the default nodes are present.
     If not, they will be set up.
@@ -62,9 +74,11 @@ def check_default_material(material: bpy.types.Material):
         n_bsdf = nodes['Principled BSDF']
 
     # check if link from BSDF to output is available
+    # compare pointers once instead of going through RNA comparison per link
+    p_bsdf, p_output = n_bsdf.as_pointer(), n_output.as_pointer()
     link_exists = False
     for lnk in tree.links:
-        if (lnk.from_node == n_bsdf) and (lnk.to_node == n_output):
+        if lnk.from_node.as_pointer() == p_bsdf and lnk.to_node.as_pointer() == p_output:
             link_exists = True
             break
     if not link_exists:
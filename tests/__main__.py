@@ -119,8 +119,9 @@ def import_and_run_implemented_tests():
     test_geometry.main()
 
     # misc (aka spare) tests
-    from tests.misc import test_config, test_interfaces, test_postprocessing
+    from tests.misc import test_config, test_dataset, test_interfaces, test_postprocessing
     test_config.main()
+    test_dataset.main()
     test_interfaces.main()
     test_postprocessing.main()
 
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2020 - for information on the respective copyright owner
+# see the NOTICE file and/or the repository
+# <https://github.com/boschresearch/amira-blender-rendering>.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from amira_blender_rendering.dataset import get_environment_textures, RandomChoice, format_width, \
+    build_directory_info, create_directory_tree
+
+"""Test file for main functionalities in amira_blender_rendering.dataset"""
+
+
+class TestDataset(unittest.TestCase):
+
+    def setUp(self):
+        self._tmpdir = tempfile.mkdtemp()
+        self._files = ['a.hdr', 'b.png', 'c.jpg']
+        for f in self._files + ['README.md']:
+            open(os.path.join(self._tmpdir, f), 'w').close()
+        os.mkdir(os.path.join(self._tmpdir, 'subdir.png'))
+
+    def test_get_environment_textures(self):
+        textures = get_environment_textures(self._tmpdir)
+        self.assertIsInstance(textures, tuple)
+        self.assertEqual(sorted(textures), sorted(os.path.join(self._tmpdir, f) for f in self._files))
+        # single file
+        fpath = os.path.join(self._tmpdir, self._files[0])
+        self.assertEqual(get_environment_textures(fpath), (fpath, ))
+
+    def test_random_choice(self):
+        items = ('a', 'b', 'c')
+        choice = RandomChoice(items, block_size=4)
+        draws = [choice() for _ in range(10)]
+        self.assertTrue(all(d in items for d in draws))
+        # resetting with equally seeded generators repeats the draws
+        choice.reset(np.random.default_rng(3))
+        first = [choice() for _ in range(6)]
+        choice.reset(np.random.default_rng(3))
+        self.assertEqual([choice() for _ in range(6)], first)
+        with self.assertRaises(ValueError):
+            RandomChoice([])
+
+    def test_format_width(self):
+        self.assertEqual([format_width(n) for n in (0, 1, 10, 11, 100, 101)], [1, 1, 1, 2, 2, 3])
+
+    def test_create_directory_tree(self):
+        dirinfo = build_directory_info(os.path.join(self._tmpdir, 'dataset'))
+        create_directory_tree(dirinfo)
+        create_directory_tree(dirinfo)
+        for path in (dirinfo.images.rgb, dirinfo.images.depth, dirinfo.annotations.opencv):
+            self.assertTrue(os.path.isdir(path))
+
+    def tearDown(self):
+        shutil.rmtree(self._tmpdir)
+
+
+def main():
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestDataset))
+    runner = unittest.TextTestRunner()
+    runner.run(suite)
+
+
+if __name__ == '__main__':
+    main()
@@ -36,6 +36,14 @@ class TestPostprocessing(unittest.TestCase):
         box = pp.boundingbox_from_mask(self._mask)
         npt.assert_array_equal(self._test_box, box, err_msg='Bounding boxes do not match')
 
+    def test_bbox_from_empty_mask(self):
+        self.assertIsNone(pp.boundingbox_from_mask(np.zeros((10, 10), dtype=bool)))
+
+    def test_bbox_from_bool_mask(self):
+        mask = np.zeros((10, 12), dtype=bool)
+        mask[4:7, 2:10] = True
+        npt.assert_array_equal(np.array([[2, 4], [9, 6]]), pp.boundingbox_from_mask(mask))
+
     def tearDown(self):
         self._mask = None
 